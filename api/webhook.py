@@ -11,6 +11,11 @@ import types
 from http.server import BaseHTTPRequestHandler
 from aiogram.types import Update
 
+try:
+    import uvloop
+except Exception:
+    uvloop = None
+
 # Добавляем корневую директорию в путь
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -18,11 +23,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# uvloop (если установлен) создаёт loop для каждого asyncio.run(); без него - стандартный loop
+_loop_factory = uvloop.new_event_loop if uvloop is not None else None
+
 # Глобальные переменные для отслеживания инициализации
 _initialized = False
 _init_lock = None
 dp = None
 bot = None
+db = None
 init_bot_components = None
 _import_error = None
 
@@ -47,7 +56,7 @@ async def ensure_initialized():
 # Импортируем компоненты бота
 try:
     logger.info("Импорт компонентов бота...")
-    from src.bot import dp, bot, init_bot_components
+    from src.bot import dp, bot, db, init_bot_components
     logger.info("Компоненты бота успешно импортированы")
 except Exception as e:
     _import_error = str(e)
@@ -56,6 +65,7 @@ except Exception as e:
     logger.error(f"Traceback: {traceback.format_exc()}")
     dp = None
     bot = None
+    db = None
     init_bot_components = None
 
 # Определяем функцию handler
@@ -158,8 +168,12 @@ def _handler_function(req):
             # Преобразуем словарь в объект Update
             update = Update(**update_data)
             
-            # Обрабатываем обновление
-            await dp.feed_update(bot, update)
+            # Обрабатываем обновление. Соединения с БД привязаны к event loop этого запроса,
+            # поэтому закрываем их до завершения asyncio.run(), а не оставляем висеть
+            try:
+                await dp.feed_update(bot, update)
+            finally:
+                await db.close()
             
             logger.info(f"Обновление {update_data.get('update_id')} обработано")
         
@@ -168,7 +182,7 @@ def _handler_function(req):
             # Используем asyncio.run() для создания нового event loop
             # Это необходимо для корректной работы aiohttp таймаутов
             # В serverless окружении каждый запрос выполняется изолированно
-            asyncio.run(process_update())
+            asyncio.run(process_update(), loop_factory=_loop_factory)
             
         except Exception as e:
             logger.error(f"Ошибка при обработке обновления: {e}", exc_info=True)
@@ -0,0 +1,15 @@
+-- Агрегация статистики подписок на стороне базы данных
+-- Используется REST API веткой Database.get_subscription_stats через /rest/v1/rpc/get_subscription_stats
+
+CREATE OR REPLACE FUNCTION get_subscription_stats()
+RETURNS TABLE (subscription_type TEXT, count BIGINT, active_count BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        u.subscription_type,
+        COUNT(*) AS count,
+        COUNT(*) FILTER (WHERE u.subscription_end_date > NOW()) AS active_count
+    FROM telegram_users u
+    GROUP BY u.subscription_type;
+$$;
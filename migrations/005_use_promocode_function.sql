@@ -0,0 +1,16 @@
+-- Атомарная регистрация использования промокода одним запросом
+-- Используется REST API веткой Database.use_promocode через /rest/v1/rpc/use_promocode
+
+CREATE OR REPLACE FUNCTION use_promocode(p_promocode_id INTEGER, p_user_id BIGINT)
+RETURNS VOID
+LANGUAGE sql
+VOLATILE
+AS $$
+    WITH usage AS (
+        INSERT INTO telegram_promocode_usage (promocode_id, user_id, usage_date)
+        VALUES (p_promocode_id, p_user_id, NOW())
+    )
+    UPDATE telegram_promocodes
+    SET current_uses = current_uses + 1
+    WHERE id = p_promocode_id;
+$$;
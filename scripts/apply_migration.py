@@ -15,6 +15,10 @@ if sys.platform == 'win32':
 
 load_dotenv()
 
+# Корень проекта в пути - для общего с ботом модуля src.storage_paths
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.storage_paths import get_schema_marker_path
+
 # Пробуем импортировать Supabase клиент
 try:
     from supabase import create_client, Client
@@ -23,6 +27,13 @@ except ImportError:
     SUPABASE_AVAILABLE = False
     print("⚠️ Supabase Python клиент не установлен. Установите: pip install supabase")
 
+def invalidate_schema_marker():
+    """Удаляет маркер проверенной схемы, чтобы бот заново проверил таблицы после миграции"""
+    try:
+        os.remove(get_schema_marker_path())
+    except FileNotFoundError:
+        pass
+
 async def apply_migration_via_supabase_api():
     """Применение миграции через Supabase Python SDK используя RPC функцию exec_sql"""
     if not SUPABASE_AVAILABLE:
@@ -159,6 +170,7 @@ async def apply_migration():
         print("🔑 Найден SUPABASE_SERVICE_ROLE_KEY, пробуем применить миграцию через API...")
         success = await apply_migration_via_supabase_api()
         if success:
+            invalidate_schema_marker()
             print("\n✅ Миграция успешно применена через Supabase API!")
             return
         else:
@@ -305,6 +317,7 @@ async def apply_migration():
         
         # Выполняем миграцию
         await conn.execute(sql)
+        invalidate_schema_marker()
         
         print("✅ Миграция успешно применена!")
         print("\n📊 Проверка созданных таблиц...")
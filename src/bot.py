@@ -8,6 +8,7 @@ import secrets
 import string
 import random
 import re
+from datetime import datetime, timedelta, timezone
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, LabeledPrice, PreCheckoutQuery, InlineKeyboardButton, InlineKeyboardMarkup
@@ -24,6 +25,11 @@ from src.keyboards import get_main_menu, get_subscription_menu, get_premium_opti
 from src.mantras import create_mantra_random, create_mantra_by_request, parse_mantra
 from src.alphabet_knowledge import AlphabetAnalyzer, check_if_gift_or_command
 
+try:
+    import uvloop
+except Exception:
+    uvloop = None
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -2884,7 +2890,7 @@ async def admin_list_promos(callback: CallbackQuery):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
     
-    promos = await db.get_all_promocodes()
+    promos = [p async for p in db.get_all_promocodes()]
     
     if not promos:
         await callback.message.edit_text(
@@ -2951,7 +2957,7 @@ async def admin_delete_promo(callback: CallbackQuery):
     promo_id = int(callback.data.replace("admin_delete_promo_", ""))
     
     # Получаем информацию о промокоде
-    promos = await db.get_all_promocodes()
+    promos = [p async for p in db.get_all_promocodes()]
     promo = None
     for p in promos:
         if p['id'] == promo_id:
@@ -3006,16 +3012,43 @@ async def admin_stats(callback: CallbackQuery):
     await safe_edit_text(callback.message, text, reply_markup=get_admin_menu(), parse_mode="Markdown")
     await callback.answer()
 
+# Постраничный список пользователей: курсор (registration_date, user_id) последней строки
+# страницы передаётся в callback_data (не длиннее 64 байт) как микросекунды с эпохи
+_USERS_PAGE_SIZE = 20
+_USERS_PAGE_PREFIX = "admin_users_page_"
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _encode_users_cursor(registration_date, user_id: int):
+    """callback_data кнопки «Далее» или None, если курсор построить нельзя"""
+    registered = Database._parse_dt(registration_date)
+    if registered is None:
+        return None
+    micros = (registered - _EPOCH) // timedelta(microseconds=1)
+    return f"{_USERS_PAGE_PREFIX}{micros}_{user_id}"
+
+def _decode_users_cursor(data: str):
+    """Курсор (registration_date, user_id) из callback_data кнопки «Далее»"""
+    micros, user_id = data[len(_USERS_PAGE_PREFIX):].split("_")
+    return _EPOCH + timedelta(microseconds=int(micros)), int(user_id)
+
 @dp.callback_query(F.data == "admin_list_users")
+@dp.callback_query(F.data.startswith(_USERS_PAGE_PREFIX))
 async def admin_list_users(callback: CallbackQuery):
-    """Список пользователей с подписками"""
+    """Список пользователей с подписками (по страницам)"""
     user_id = callback.from_user.id
     
     if not await db.is_admin(user_id):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
     
-    users = await db.get_all_users_with_subscriptions(limit=50)
+    before = None
+    if callback.data.startswith(_USERS_PAGE_PREFIX):
+        before = _decode_users_cursor(callback.data)
+    
+    # Лишняя строка показывает, есть ли следующая страница
+    users = await db.get_all_users_with_subscriptions(limit=_USERS_PAGE_SIZE + 1, before=before)
+    has_next = len(users) > _USERS_PAGE_SIZE
+    users = users[:_USERS_PAGE_SIZE]
     
     if not users:
         text = "👥 *Пользователи*\n\n❌ Пользователи не найдены"
@@ -3023,8 +3056,6 @@ async def admin_list_users(callback: CallbackQuery):
         await callback.answer()
         return
     
-    from datetime import datetime
-    
     text = f"👥 *Пользователи* ({len(users)})\n\n"
     
     active_count = 0
@@ -3032,7 +3063,7 @@ async def admin_list_users(callback: CallbackQuery):
     trial_count = 0
     premium_count = 0
     
-    for user in users[:20]:  # Показываем первые 20
+    for user in users:
         user_id_val = user['user_id']
         username = user['username'] or "—"
         first_name = user['first_name'] or "—"
@@ -3044,8 +3075,9 @@ async def admin_list_users(callback: CallbackQuery):
         status = ""
         if sub_end:
             try:
-                end_date = datetime.fromisoformat(sub_end)
-                now = datetime.now()
+                # PostgreSQL/SQLite (BOT_TIMESTAMP) отдают datetime, REST API - ISO-строку
+                end_date = Database._parse_dt(sub_end)
+                now = datetime.now(timezone.utc)
                 if end_date > now:
                     days_left = (end_date - now).days
                     status = f"🟢 ({days_left}д)"
@@ -3066,16 +3098,24 @@ async def admin_list_users(callback: CallbackQuery):
         text += f"{is_admin} *{user_id_val}* | @{username}\n"
         text += f"   {first_name} | {sub_type} {status}\n\n"
     
-    if len(users) > 20:
-        text += f"\n... и еще {len(users) - 20} пользователей\n"
-    
-    text += f"\n📊 *Статистика:*\n"
+    text += f"\n📊 *Статистика (страница):*\n"
     text += f"🟢 Активных: {active_count}\n"
     text += f"🟡 Trial: {trial_count}\n"
     text += f"⭐ Premium: {premium_count}\n"
     text += f"🔴 Истекших: {expired_count}"
     
-    await safe_edit_text(callback.message, text, reply_markup=get_admin_menu(), parse_mode="Markdown")
+    keyboard = get_admin_menu().inline_keyboard
+    if has_next:
+        last = users[-1]
+        next_data = _encode_users_cursor(last['registration_date'], last['user_id'])
+        if next_data:
+            keyboard = [[InlineKeyboardButton(text="Далее »", callback_data=next_data)]] + keyboard
+    
+    await safe_edit_text(
+        callback.message, text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
+        parse_mode="Markdown"
+    )
     await callback.answer()
 
 @dp.callback_query(F.data == "admin_cancel")
@@ -3198,11 +3238,16 @@ async def main():
     logger.info("=" * 50)
     logger.info("Запуск бота (polling)...")
     logger.info("=" * 50)
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await db.close()
 
 if __name__ == "__main__":
+    # uvloop (если установлен) заметно ускоряет сетевой I/O aiogram и asyncpg.
+    # loop_factory вместо set_event_loop_policy: политики loop'ов устарели в Python 3.14
     try:
-        asyncio.run(main())
+        asyncio.run(main(), loop_factory=uvloop.new_event_loop if uvloop is not None else None)
     except KeyboardInterrupt:
         logger.info("Бот остановлен")
 
@@ -3,6 +3,7 @@
 """
 import os
 from dotenv import load_dotenv
+from src.storage_paths import get_database_path, get_schema_marker_path, is_vercel
 
 # Загрузка переменных окружения из .env файла (только для локальной разработки)
 # На Railway переменные уже будут в окружении
@@ -59,15 +60,21 @@ class Config:
     USE_POSTGRESQL = bool(SUPABASE_DB_URL)
     USE_SUPABASE = USE_SUPABASE_API or USE_POSTGRESQL
     
+    # Размер пула соединений asyncpg (один pool на процесс, соединения переиспользуются)
+    PG_POOL_MIN_SIZE = int(os.getenv('PG_POOL_MIN_SIZE', '1'))
+    PG_POOL_MAX_SIZE = int(os.getenv('PG_POOL_MAX_SIZE', '10'))
+    
     # SQLite настройки (только для локальной разработки)
-    default_db_path = 'data/bot_database.db'
-    if os.getenv('VERCEL') or os.getenv('VERCEL_ENV'):
+    if is_vercel() and not USE_SUPABASE:
         # На Vercel без Supabase используем /tmp (временное хранилище)
-        if not USE_SUPABASE:
-            print("⚠️ ВНИМАНИЕ: На Vercel SQLite работает только в /tmp (временное хранилище)")
-            print("💡 Рекомендуется настроить SUPABASE_DB_URL для постоянного хранения данных")
-        default_db_path = '/tmp/bot_database.db'
-    DATABASE_PATH = os.getenv('DATABASE_PATH', default_db_path)
+        print("⚠️ ВНИМАНИЕ: На Vercel SQLite работает только в /tmp (временное хранилище)")
+        print("💡 Рекомендуется настроить SUPABASE_DB_URL для постоянного хранения данных")
+    DATABASE_PATH = get_database_path()
+    
+    # Схема PostgreSQL уже создана миграциями - не проверять её при каждом запуске
+    ASSUME_SCHEMA_READY = os.getenv('ASSUME_SCHEMA_READY', '').strip().lower() in ('1', 'true', 'yes')
+    # Файл-маркер успешной проверки схемы PostgreSQL (удаляется скриптом применения миграций)
+    SCHEMA_MARKER_PATH = get_schema_marker_path(DATABASE_PATH)
     
     # Определяем тип БД
     if USE_SUPABASE_API:
@@ -5,14 +5,19 @@
 - SQLite - для локальной разработки
 """
 import aiosqlite
+import sqlite3
 import logging
 import os
 import asyncio
 import contextlib
-from datetime import datetime, timedelta
+import functools
+import pathlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from src.config import Config
-from urllib.parse import urlparse
-from supabase import create_client
+from src.reference_data import MA_ZHI_KUN_POSITIONS, GIFT_FIELDS
+from urllib.parse import urlparse, urlencode, parse_qsl
+from supabase import acreate_client
 from dateutil.parser import isoparse
 
 try:
@@ -20,9 +25,226 @@ try:
 except Exception:
     asyncpg = None
 
+logger = logging.getLogger(__name__)
+
+# Версия схемы SQLite (PRAGMA user_version). Увеличивайте при изменении SQLITE_SCHEMA_SQL,
+# чтобы init_db применил скрипт к уже существующим базам
+SQLITE_SCHEMA_VERSION = 3
+
+SQLITE_SCHEMA_SQL = """
+-- Таблица пользователей
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    birth_date TEXT,
+    registration_date BOT_TIMESTAMP,
+    subscription_type TEXT DEFAULT 'trial',
+    subscription_end_date BOT_TIMESTAMP,
+    is_active INTEGER DEFAULT 1,
+    is_admin INTEGER DEFAULT 0
+);
+
+-- Таблица расчетов даров
+CREATE TABLE IF NOT EXISTS calculations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    calculation_type TEXT,
+    birth_date TEXT,
+    result_data TEXT,
+    calculation_date TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+
+-- Таблица для базы знаний о дарах
+CREATE TABLE IF NOT EXISTS gifts_knowledge (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    gift_number INTEGER,
+    gift_name TEXT,
+    description TEXT,
+    characteristics TEXT,
+    category TEXT
+);
+
+-- Таблица истории взаимодействий с ИИ
+CREATE TABLE IF NOT EXISTS ai_interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    query TEXT,
+    response TEXT,
+    interaction_date TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+
+-- Таблица платежей
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    amount INTEGER,
+    currency TEXT,
+    payment_date TEXT,
+    subscription_type TEXT,
+    status TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+
+-- Таблица алфавита для анализа слов
+CREATE TABLE IF NOT EXISTS alphabet (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    letter TEXT UNIQUE,
+    name TEXT,
+    description TEXT
+);
+
+-- Таблица промокодов
+CREATE TABLE IF NOT EXISTS promocodes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT UNIQUE NOT NULL,
+    type TEXT NOT NULL,
+    discount_percent INTEGER,
+    subscription_days INTEGER,
+    subscription_type TEXT,
+    max_uses INTEGER,
+    current_uses INTEGER DEFAULT 0,
+    created_date TEXT,
+    created_by INTEGER,
+    is_active INTEGER DEFAULT 1,
+    FOREIGN KEY (created_by) REFERENCES users (user_id)
+);
+
+-- Таблица использований промокодов
+CREATE TABLE IF NOT EXISTS promocode_usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    promocode_id INTEGER,
+    user_id INTEGER,
+    usage_date TEXT,
+    FOREIGN KEY (promocode_id) REFERENCES promocodes (id),
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+
+-- Таблица позиций Ма-Жи-Кун
+CREATE TABLE IF NOT EXISTS ma_zhi_kun_positions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    description TEXT NOT NULL
+);
+
+-- Таблица полей (1-9)
+CREATE TABLE IF NOT EXISTS gift_fields (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+
+-- Индексы для истории платежей и расчетов пользователя
+CREATE INDEX IF NOT EXISTS idx_payments_user_date ON payments(user_id, payment_date DESC);
+CREATE INDEX IF NOT EXISTS idx_calculations_user_date ON calculations(user_id, calculation_date DESC);
+
+-- Индексы для проверки использования промокода и списка пользователей
+CREATE INDEX IF NOT EXISTS idx_promocode_usage_user_promo ON promocode_usage(user_id, promocode_id);
+CREATE INDEX IF NOT EXISTS idx_users_registration_date ON users(registration_date DESC);
+CREATE INDEX IF NOT EXISTS idx_promocode_usage_promo ON promocode_usage(promocode_id);
+
+-- Каскадное удаление использований промокода. Триггер, а не ON DELETE CASCADE:
+-- внешний ключ существующей таблицы в SQLite не изменить без пересоздания,
+-- а PRAGMA foreign_keys пришлось бы включать на каждом соединении
+CREATE TRIGGER IF NOT EXISTS trg_promocodes_delete_usage
+AFTER DELETE ON promocodes
+BEGIN
+    DELETE FROM promocode_usage WHERE promocode_id = OLD.id;
+END;
+"""
+
+# DDL по колонкам, которые в старых базах добавляются миграциями init_db (ALTER TABLE).
+# Выполняется после миграций, иначе скрипт падает на базе без этих колонок
+SQLITE_POST_MIGRATION_SQL = """
+-- Частичный индекс для списка админов
+CREATE INDEX IF NOT EXISTS idx_users_admin ON users(user_id) WHERE is_admin = 1;
+"""
+
+
+# Запросы горячего пути PostgreSQL. asyncpg кэширует подготовленные выражения
+# на каждом соединении по тексту запроса (statement_cache_size), поэтому повторные
+# вызовы пропускают parse/plan. Кэш отключается только при работе через pooler
+_PG_GET_USER_SQL = "SELECT * FROM telegram_users WHERE user_id = $1"
+_PG_GET_PROMOCODE_SQL = "SELECT * FROM telegram_promocodes WHERE code = $1 AND is_active = TRUE"
+_PG_CHECK_PROMOCODE_USAGE_SQL = """
+    SELECT EXISTS(
+        SELECT 1 FROM telegram_promocode_usage 
+        WHERE user_id = $1 AND promocode_id = $2
+    )
+"""
+_PG_IS_ADMIN_SQL = "SELECT is_admin FROM telegram_users WHERE user_id = $1"
+
+# Момент времени колонки SQLite в UTC (julianday). Значения со смещением или 'Z' julianday()
+# переводит в UTC сам; наивные значения старых баз - локальное время, как в _parse_dt
+_SQLITE_JULIANDAY_UTC_SQL = """
+    CASE
+        WHEN {column} GLOB '*[+-][0-9][0-9]:[0-9][0-9]' OR {column} GLOB '*Z'
+        THEN julianday({column})
+        ELSE julianday({column}, 'utc')
+    END
+"""
+
+_PG_INSERT_PROMOCODE_SQL = """
+    INSERT INTO telegram_promocodes 
+    (code, type, discount_percent, subscription_days, subscription_type, max_uses, created_date, created_by)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+"""
+_PG_INSERT_PROMOCODE_RETURNING_ID_SQL = _PG_INSERT_PROMOCODE_SQL + "RETURNING id"
+_SQLITE_INSERT_PROMOCODE_SQL = """
+    INSERT INTO promocodes 
+    (code, type, discount_percent, subscription_days, subscription_type, max_uses, created_date, created_by)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Справочник алфавита: (буква, название, описание). Общий для всех экземпляров Database
+_ALPHABET_DATA = (
+    ("А", "Оду", "выбор обусловленный вас в точке внешне. Точка судьбы, точка отправления. Если А оформить в Оду - это О."),
+    ("Б", "Братья", "соединяющая, объединяющий."),
+    ("В", "Воздух", "трансляция, вышка. Как завывает ветер."),
+    ("Г", "Грани", "огранка, ограничивающая. Граница которая двигается. Тут много алхимических процессов."),
+    ("Д", "Дума", "обладает внешними границами. Потенциальная точка входа, которая обладает внешними границами. Есть нахальность и потенциальность. Развилка."),
+    ("Е", "", ""),
+    ("Ж", "Жизнь", "сила, рождающая жизнь"),
+    ("З", "Зета", "разрез, зеркало. Зевать. Процесс разделения. Как секира. Активно действует. Отрывающая. Я тебя срезал."),
+    ("И", "", "связь, вспомогательная, более подвижная связь. Если И возвести в Оду - получается Н."),
+    ("Й", "", "если И оплодотворить райдой. Более активное движение"),
+    ("К", "Кама", "кодировка. Кодировка в поле МА. Работаем где-то с потенциалом. С тем, чего еще не существует в принципе."),
+    ("Л", "Лота", "лезвие, разделяющий, линия. С твердыми, проявленными объектами. Отделить одно тело от другого. Работает еще и с Духом. Имеет выбор с чем работать. Вычерчивает границу от тебя. Отстаивания подвижных границ. Я устанавливаю правило границ"),
+    ("М", "Мана", "то что рождает выбор, создающий связи выбора. Мама рождает ребенка, который может родить еще одного ребенка. Одно рождает другое."),
+    ("Н", "Нита", "натянутая нить. Связи."),
+    ("О", "Ома", "если она присутствует - значит есть душа"),
+    ("П", "Приа", "портал, проникновение, пушка, поход, путешествие, поддержка. Портал, который С чем-то связывает. Связь с внешним объектом. П часто зависима. Она пропускает. Место куда мы идем зависит от места, где мы находимся. Выбор объекта, куда мы придем."),
+    ("Р", "Райда", "движение выбора связующее с внешним действием. Путь, стрела, толкающий. АКТИВНОСТЬ"),
+    ("С", "Сутра", "связующая. Что-то связующее с точкой, обладающее двигающим выбором. Одно синхронизировано с другим. Та что готова синхронизироваться. Провод от розетки"),
+    ("Т", "ТаАта", "тело. Сосуд, который имеет автоматический объект. Предмет. Не наделенное Духом. Наделить - Таата бра Ома."),
+    ("У", "", "точка входа"),
+    ("Ф", "Фата, фита", "КЛЮЧ. То, что открывает, вскрывает поле Ома, как ключом. Фа - подсознание, Фи - осознание. Фа - мы проникаем, фи - связываемся. Вверх активно, вниз нас ведут. Фата ты имеешь право выбора, а фита - выбора нет, за тебя выбирают."),
+    ("Х", "Храм", "то место, где начинается действие."),
+    ("Ц", "Циа", "возвышение. Энергия Ци. Подцепить, цеплять, цепь. Подхватывает из-под низа и поднимает наверх."),
+    ("Ч", "Чиа", "экосистемы, энергоцентр. Черта связующая с выбором. Кто-то провел черту от высших вниз. Кто-то сверху спустился вниз. Можно спускаться вниз. Как заземлитесь. Или провести черту. Черчение. Буква Л только с Божественной волей."),
+    ("Ш", "Ши", "внимание, внимание куда-либо стремится, связаться с чем-либо. Ши - это как руки к небу - энергия опускается через руки и попадает в ШишкУ."),
+    ("Щ", "", ""),
+    ("Ы", "", ""),
+    ("Э", "", ""),
+    ("Ю", "Юдл", "состоит из Й + У. Если И оплодотворить райдой + точка входа"),
+    ("Я", "ЙА", "состоит из Й + А. Если И оплодотворить райдой + Оду (точка судьбы, выбор)"),
+)
+
+# Готовый payload для upsert через REST API
+_ALPHABET_PAYLOAD = [
+    {"letter": letter, "name": name, "description": description}
+    for letter, name, description in _ALPHABET_DATA
+]
+
+
 class Database:
     """Класс для работы с базой данных"""
     
+    # Схема PostgreSQL уже проверена в этом процессе
+    _pg_schema_checked = False
+    
     def __init__(self, db_path: str = None, database_url: str = None):
         # Приоритет у REST API: если есть SUPABASE_API_KEY, используем его
         self.use_supabase_api = Config.USE_SUPABASE_API
@@ -43,38 +265,81 @@ class Database:
                 os.makedirs(db_dir, exist_ok=True)
         
         self.pool = None  # Connection pool для PostgreSQL/Supabase
-        self._pool_loop = None  # Event loop, к которому привязан pool
-        self._supabase = None
-        if self.use_supabase_api:
-            self._supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_API_KEY)
-        elif self.use_postgresql and asyncpg is None:
+        # Event loop, к которому привязан pool. Привязку нельзя убирать:
+        # api/webhook.py обрабатывает каждое обновление в новом asyncio.run(),
+        # а pool asyncpg работает только в loop'е, где был создан
+        self._pool_loop = None
+        self._pg_pooled = False  # Подключение идёт через pooler Supabase (transaction mode)
+        self._alphabet_cache = None  # letter -> строка алфавита (см. _get_alphabet_cache)
+        self._alphabet_list = []
+        self._sqlite = None  # Общее соединение SQLite (см. _get_sqlite)
+        self._sqlite_write_lock = None
+        self._sqlite_lock_loop = None
+        self._supabase = None  # Асинхронный клиент Supabase (создаётся в _get_supabase)
+        self._supabase_loop = None
+        self._inflight_users = {}  # user_id -> задача текущего запроса get_user
+        if self.use_postgresql and asyncpg is None:
             raise RuntimeError(
                 "asyncpg не установлен, но требуется PostgreSQL. "
                 "Установите asyncpg или используйте SUPABASE_API_KEY без SUPABASE_DB_URL."
             )
 
-    async def _sb(self, fn):
-        """Запускает синхронный вызов Supabase в отдельном потоке."""
-        return await asyncio.to_thread(fn)
+    async def _get_supabase(self):
+        """Асинхронный клиент Supabase для текущего event loop (httpx.AsyncClient привязан к loop)"""
+        client = self._supabase
+        loop = asyncio.get_running_loop()
+        if client is None or self._supabase_loop is not loop:
+            client = await acreate_client(Config.SUPABASE_URL, Config.SUPABASE_API_KEY)
+            self._supabase = client
+            self._supabase_loop = loop
+        return client
+
+    @staticmethod
+    def _is_missing_rpc(error) -> bool:
+        """Проверяет, что ошибка Supabase вызвана отсутствием SQL-функции (миграция не применена)"""
+        error_msg = str(error)
+        return "PGRST202" in error_msg or "Could not find the function" in error_msg
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def _parse_dt(value):
-        if value is None or isinstance(value, datetime):
-            return value
-        try:
-            return isoparse(value)
-        except Exception:
+        """Приводит дату из любого бэкенда к datetime с часовым поясом (наивные - локальное время)"""
+        if value is None:
+            return None
+        if not isinstance(value, datetime):
+            # Быстрый путь: datetime.fromisoformat реализован на C, isoparse - запасной вариант
             try:
-                return datetime.fromisoformat(value)
-            except Exception:
-                return None
+                value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except (TypeError, ValueError, AttributeError):
+                try:
+                    value = isoparse(value)
+                except Exception:
+                    return None
+        if value.tzinfo is None:
+            value = value.astimezone()
+        return value
+    
+    @classmethod
+    def _normalize_user(cls, row):
+        """Приводит строку пользователя любого бэкенда к dict с datetime в subscription_end_date"""
+        if row is None:
+            return None
+        user = dict(row)
+        user['subscription_end_date'] = cls._parse_dt(user.get('subscription_end_date'))
+        return user
         
     async def _ensure_pool(self):
         """Обеспечивает наличие connection pool для текущего event loop"""
-        try:
-            current_loop = asyncio.get_running_loop()
-        except RuntimeError:
-            current_loop = asyncio.get_event_loop()
+        # Быстрый путь: pool уже создан в текущем loop - одна проверка идентичности.
+        # Полностью убрать проверку нельзя: webhook создаёт новый loop на каждый запрос
+        pool = self.pool
+        if pool is not None and self._pool_loop is asyncio.get_running_loop():
+            return pool
+        return await self._ensure_pool_slow()
+    
+    async def _ensure_pool_slow(self):
+        """Создаёт (или пересоздаёт после смены event loop) connection pool"""
+        current_loop = asyncio.get_running_loop()
         
         # Проверяем, нужно ли пересоздать pool
         if self.pool is None or (self._pool_loop is not None and self._pool_loop is not current_loop):
@@ -90,58 +355,160 @@ class Database:
             # Но если используется connection pooling URL, оставляем как есть
             conn_url = self.database_url
             
-            # Если URL содержит pgbouncer и используется Supabase, лучше использовать direct connection
-            # Но можно оставить pgbouncer, если нужна лучшая производительность при большом количестве соединений
-            # Для asyncpg обычно direct connection работает лучше
-            if 'pooler.supabase.com' in conn_url or 'pgbouncer=true' in conn_url:
-                # Используем как есть - asyncpg может работать с pgbouncer
-                pass
+            # Supabase pooler (pgbouncer/Supavisor, порт 6543) работает в transaction mode:
+            # подготовленные выражения и настройки сессии между транзакциями не сохраняются,
+            # поэтому кэш выражений asyncpg отключаем, а сессию не настраиваем
+            self._pg_pooled = self._is_pooler_url(conn_url)
+            if self._pg_pooled:
+                conn_url = self._strip_pgbouncer_param(conn_url)
             
             self.pool = await asyncpg.create_pool(
                 conn_url, 
-                min_size=1, 
-                max_size=10,
-                command_timeout=30  # Таймаут для команд
+                min_size=Config.PG_POOL_MIN_SIZE,
+                max_size=Config.PG_POOL_MAX_SIZE,
+                command_timeout=30,  # Таймаут для команд
+                max_inactive_connection_lifetime=300,  # Освобождаем простаивающие сессии pooler'а
+                statement_cache_size=0 if self._pg_pooled else 1024,
+                server_settings=self._pg_server_settings(self._pg_pooled)
             )
             self._pool_loop = current_loop
         
         return self.pool
     
+    @staticmethod
+    def _is_pooler_url(url: str) -> bool:
+        """Проверяет, что URL указывает на pooler Supabase (transaction mode)"""
+        parsed = urlparse(url)
+        return (
+            'pooler.supabase.com' in (parsed.hostname or '')
+            or parsed.port == 6543
+            or 'pgbouncer=true' in parsed.query
+        )
+    
+    @staticmethod
+    def _strip_pgbouncer_param(url: str) -> str:
+        """Убирает параметр pgbouncer=true: asyncpg передал бы его серверу как настройку сессии"""
+        parsed = urlparse(url)
+        query = [(k, v) for k, v in parse_qsl(parsed.query) if k != 'pgbouncer']
+        return parsed._replace(query=urlencode(query)).geturl()
+    
+    @staticmethod
+    def _pg_server_settings(pooled: bool) -> dict:
+        """Параметры сессии, передаваемые при подключении (startup-параметры)
+        
+        В отличие от SET, они переживают RESET ALL, который pool выполняет
+        при каждом возврате соединения. Pooler в transaction mode их не сохраняет
+        """
+        settings = {"application_name": "dar_stars_bot"}
+        if not pooled:
+            settings.update(jit="off", timezone="UTC", statement_timeout="30s")
+        return settings
+    
     @contextlib.asynccontextmanager
     async def _pg_connection_ctx(self):
         """Context manager для получения соединения с PostgreSQL"""
         pool = await self._ensure_pool()
-        conn = await pool.acquire()
-        try:
+        async with pool.acquire() as conn:
             yield conn
-        finally:
-            try:
-                await pool.release(conn)
-            except Exception:
-                # Игнорируем ошибки при освобождении соединения
-                pass
     
-    async def _get_pg_connection(self):
-        """Получает соединение с PostgreSQL (для обратной совместимости)"""
-        # ВАЖНО: Этот метод должен использоваться с try/finally и _release_pg_connection
-        # Лучше использовать _pg_connection_ctx() как context manager
-        pool = await self._ensure_pool()
-        return await pool.acquire()
+    @classmethod
+    def _convert_sqlite_timestamp(cls, value: bytes):
+        """Конвертер колонок BOT_TIMESTAMP: ISO-строки, в том числе со смещением, -> datetime
+        
+        Нераспознанное значение возвращается строкой, как есть, а не теряется как None
+        """
+        text = value.decode()
+        parsed = cls._parse_dt(text)
+        return parsed if parsed is not None else text
     
-    async def _release_pg_connection(self, conn):
-        """Освобождает соединение с PostgreSQL"""
-        if self.pool and conn:
+    async def _get_sqlite(self):
+        """Общее соединение SQLite: открывается один раз, PRAGMA выполняются при открытии"""
+        db = self._sqlite
+        if db is None:
+            # Свой тип, а не TIMESTAMP: стандартный конвертер sqlite3 остаётся нетронутым
+            # для остального процесса (и он не понимает смещение '+00:00')
+            sqlite3.register_converter("BOT_TIMESTAMP", self._convert_sqlite_timestamp)
+            # Колонки, объявленные как BOT_TIMESTAMP, сразу приходят datetime
+            db = await aiosqlite.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+            db.row_factory = aiosqlite.Row
+            await db.executescript("""
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                PRAGMA temp_store = MEMORY;
+                PRAGMA cache_size = -64000;
+            """)
+            if self._sqlite is not None:
+                # Соединение успели открыть параллельно - оставляем первое
+                await db.close()
+                return self._sqlite
+            self._sqlite = db
+        return db
+    
+    def _sqlite_lock(self):
+        """Блокировка записи в SQLite для текущего event loop (писатель у SQLite один)"""
+        loop = asyncio.get_running_loop()
+        if self._sqlite_write_lock is None or self._sqlite_lock_loop is not loop:
+            self._sqlite_write_lock = asyncio.Lock()
+            self._sqlite_lock_loop = loop
+        return self._sqlite_write_lock
+    
+    async def close(self):
+        """Закрывает общее соединение SQLite, pool PostgreSQL и клиент Supabase"""
+        if self._sqlite is not None:
+            db, self._sqlite = self._sqlite, None
+            await db.close()
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await pool.close()
+        if self._supabase is not None:
+            client, self._supabase = self._supabase, None
+            self._supabase_loop = None
+            await self._close_supabase(client)
+    
+    @staticmethod
+    async def _close_supabase(client):
+        """Закрывает HTTP-соединения клиента Supabase (PostgREST и Auth)"""
+        try:
+            # PostgREST-клиент создаётся лениво, при первом table()/rpc()
+            postgrest = getattr(client, "_postgrest", None)
+            if postgrest is not None:
+                await postgrest.aclose()
+            await client.auth.close()
+        except Exception as e:
+            logger.warning(f"Ошибка при закрытии клиента Supabase: {e}")
+    
+    @contextlib.asynccontextmanager
+    async def _sqlite_read(self):
+        """Context manager для чтения через общее соединение SQLite"""
+        yield await self._get_sqlite()
+    
+    @contextlib.asynccontextmanager
+    async def _sqlite_write(self):
+        """Context manager для записи через общее соединение SQLite (под блокировкой)"""
+        async with self._sqlite_lock():
+            db = await self._get_sqlite()
             try:
-                await self.pool.release(conn)
-            except Exception:
-                # Игнорируем ошибки при освобождении соединения
-                pass
-        
+                yield db
+            except BaseException:
+                # Не оставляем незавершённую транзакцию в общем соединении
+                await db.rollback()
+                raise
+    
+    @staticmethod
+    def _touch_schema_marker():
+        """Сохраняет маркер проверенной схемы, чтобы следующие запуски не ходили в information_schema"""
+        try:
+            os.makedirs(os.path.dirname(Config.SCHEMA_MARKER_PATH) or '.', exist_ok=True)
+            pathlib.Path(Config.SCHEMA_MARKER_PATH).touch()
+        except OSError:
+            pass  # Файловая система только для чтения - проверка повторится при следующем запуске
+    
     async def init_db(self):
         """Инициализация базы данных и создание таблиц"""
         if self.use_supabase_api:
             try:
-                await self._sb(lambda: self._supabase.table("telegram_users").select("user_id").limit(1).execute())
+                sb = await self._get_supabase()
+                await sb.table("telegram_users").select("user_id").limit(1).execute()
                 print("✅ Таблицы Supabase доступны (REST API)")
             except Exception as e:
                 print(f"⚠️ Ошибка при проверке Supabase REST API: {e}")
@@ -149,6 +516,13 @@ class Database:
             return
         if self.use_postgresql:
             # PostgreSQL - таблицы должны быть созданы через миграцию
+            if Config.ASSUME_SCHEMA_READY:
+                # Миграции применены при деплое - пропускаем проверку information_schema
+                return
+            if Database._pg_schema_checked or os.path.exists(Config.SCHEMA_MARKER_PATH):
+                # Схема уже проверялась после последней миграции
+                Database._pg_schema_checked = True
+                return
             # Проверяем, что таблицы существуют
             try:
                 async with self._pg_connection_ctx() as conn:
@@ -170,6 +544,8 @@ class Database:
                     else:
                         db_type = "Supabase" if self.use_supabase else "PostgreSQL"
                         print(f"✅ Таблицы {db_type} найдены")
+                        Database._pg_schema_checked = True
+                        self._touch_schema_marker()
             except Exception as e:
                 print(f"⚠️ Ошибка при проверке базы данных: {e}")
                 if self.use_supabase:
@@ -187,100 +563,15 @@ class Database:
         if db_dir:  # Если путь содержит директорию (не корневой файл)
             os.makedirs(db_dir, exist_ok=True)
         
-        async with aiosqlite.connect(self.db_path) as db:
-            # Таблица пользователей
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    birth_date TEXT,
-                    registration_date TEXT,
-                    subscription_type TEXT DEFAULT 'trial',
-                    subscription_end_date TEXT,
-                    is_active INTEGER DEFAULT 1,
-                    is_admin INTEGER DEFAULT 0
-                )
-            """)
+        async with self._sqlite_write() as db:
+            # Схема уже актуальна - повторный запуск не выполняет DDL
+            cursor = await db.execute("PRAGMA user_version")
+            schema_version = (await cursor.fetchone())[0]
+            if schema_version >= SQLITE_SCHEMA_VERSION:
+                return
             
-            # Таблица расчетов даров
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS calculations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    calculation_type TEXT,
-                    birth_date TEXT,
-                    result_data TEXT,
-                    calculation_date TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            
-            # Таблица для базы знаний о дарах
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS gifts_knowledge (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    gift_number INTEGER,
-                    gift_name TEXT,
-                    description TEXT,
-                    characteristics TEXT,
-                    category TEXT
-                )
-            """)
-            
-            # Таблица истории взаимодействий с ИИ
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS ai_interactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    query TEXT,
-                    response TEXT,
-                    interaction_date TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            
-            # Таблица платежей
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS payments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    amount INTEGER,
-                    currency TEXT,
-                    payment_date TEXT,
-                    subscription_type TEXT,
-                    status TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            
-            # Таблица алфавита для анализа слов
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS alphabet (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    letter TEXT UNIQUE,
-                    name TEXT,
-                    description TEXT
-                )
-            """)
-            
-            # Таблица промокодов
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS promocodes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    code TEXT UNIQUE NOT NULL,
-                    type TEXT NOT NULL,
-                    discount_percent INTEGER,
-                    subscription_days INTEGER,
-                    subscription_type TEXT,
-                    max_uses INTEGER,
-                    current_uses INTEGER DEFAULT 0,
-                    created_date TEXT,
-                    created_by INTEGER,
-                    is_active INTEGER DEFAULT 1,
-                    FOREIGN KEY (created_by) REFERENCES users (user_id)
-                )
-            """)
+            # Все таблицы и индексы создаются одним скриптом
+            await db.executescript(SQLITE_SCHEMA_SQL)
             
             # Миграция: добавление колонки subscription_type, если её нет
             cursor = await db.execute("PRAGMA table_info(promocodes)")
@@ -288,53 +579,27 @@ class Database:
             if 'subscription_type' not in columns:
                 await db.execute("ALTER TABLE promocodes ADD COLUMN subscription_type TEXT")
             
-            # Таблица использований промокодов
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS promocode_usage (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    promocode_id INTEGER,
-                    user_id INTEGER,
-                    usage_date TEXT,
-                    FOREIGN KEY (promocode_id) REFERENCES promocodes (id),
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            """)
-            
-            # Таблица позиций Ма-Жи-Кун
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS ma_zhi_kun_positions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    description TEXT NOT NULL
-                )
-            """)
-            
-            # Таблица полей (1-9)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS gift_fields (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    description TEXT NOT NULL
-                )
-            """)
-            
             # Миграция: добавление колонки is_admin, если её нет
             cursor = await db.execute("PRAGMA table_info(users)")
             columns = [row[1] for row in await cursor.fetchall()]
             if 'is_admin' not in columns:
                 await db.execute("ALTER TABLE users ADD COLUMN is_admin INTEGER DEFAULT 0")
             
+            await db.executescript(SQLITE_POST_MIGRATION_SQL)
+            
+            await db.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
             await db.commit()
     
     async def add_user(self, user_id: int, username: str = None, first_name: str = None):
         """Добавление нового пользователя (только если его еще нет)"""
-        import logging
-        logger = logging.getLogger(__name__)
+        now = datetime.now(timezone.utc)
+        trial_end = now + timedelta(days=Config.TRIAL_DURATION_DAYS)
         
         try:
             if self.use_supabase_api:
-                existing = await self._sb(
-                    lambda: self._supabase.table("telegram_users")
+                sb = await self._get_supabase()
+                existing = await (
+                    sb.table("telegram_users")
                     .select("user_id")
                     .eq("user_id", user_id)
                     .limit(1)
@@ -344,19 +609,16 @@ class Database:
                     logger.debug(f"Пользователь {user_id} уже существует в Supabase")
                     return
 
-                registration_date = datetime.now().isoformat()
-                trial_end = (datetime.now() + timedelta(days=Config.TRIAL_DURATION_DAYS)).isoformat()
-
-                await self._sb(
-                    lambda: self._supabase.table("telegram_users")
+                await (
+                    sb.table("telegram_users")
                     .insert(
                         {
                             "user_id": user_id,
                             "username": username,
                             "first_name": first_name,
-                            "registration_date": registration_date,
+                            "registration_date": now.isoformat(),
                             "subscription_type": "trial",
-                            "subscription_end_date": trial_end,
+                            "subscription_end_date": trial_end.isoformat(),
                         }
                     )
                     .execute()
@@ -364,8 +626,7 @@ class Database:
                 logger.info(f"Пользователь {user_id} успешно сохранен в Supabase")
             elif self.use_postgresql:
                 # PostgreSQL
-                conn = await self._get_pg_connection()
-                try:
+                async with self._pg_connection_ctx() as conn:
                     # Проверяем, есть ли уже пользователь
                     existing_user = await conn.fetchval(
                         "SELECT user_id FROM telegram_users WHERE user_id = $1", user_id
@@ -375,17 +636,13 @@ class Database:
                         logger.debug(f"Пользователь {user_id} уже существует в БД")
                         return
                     
-                    # Новый пользователь - создаем с триал периодом
-                    registration_date = datetime.now()
-                    trial_end = datetime.now() + timedelta(days=Config.TRIAL_DURATION_DAYS)
-                    
                     logger.info(f"Создание нового пользователя {user_id} (username={username}, first_name={first_name})")
                     async with conn.transaction():
                         await conn.execute("""
                             INSERT INTO telegram_users 
                             (user_id, username, first_name, registration_date, subscription_type, subscription_end_date)
                             VALUES ($1, $2, $3, $4, 'trial', $5)
-                        """, user_id, username, first_name, registration_date, trial_end)
+                        """, user_id, username, first_name, now, trial_end)
                     
                     # Проверяем, что данные сохранились
                     saved_user = await conn.fetchval(
@@ -397,14 +654,9 @@ class Database:
                         raise Exception(error_msg)
                     
                     logger.info(f"Пользователь {user_id} успешно сохранен в БД")
-                finally:
-                    await self._release_pg_connection(conn)
             else:
                 # SQLite
-                async with aiosqlite.connect(self.db_path) as db:
-                    # Устанавливаем настройки для надежной записи
-                    await db.execute("PRAGMA synchronous = NORMAL")
-                    
+                async with self._sqlite_write() as db:
                     # Проверяем, есть ли уже пользователь
                     cursor = await db.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
                     existing_user = await cursor.fetchone()
@@ -413,16 +665,12 @@ class Database:
                         logger.debug(f"Пользователь {user_id} уже существует в БД")
                         return
                     
-                    # Новый пользователь - создаем с триал периодом
-                    registration_date = datetime.now().isoformat()
-                    trial_end = (datetime.now() + timedelta(days=Config.TRIAL_DURATION_DAYS)).isoformat()
-                    
                     logger.info(f"Создание нового пользователя {user_id} (username={username}, first_name={first_name})")
                     await db.execute("""
                         INSERT INTO users 
                         (user_id, username, first_name, registration_date, subscription_type, subscription_end_date)
                         VALUES (?, ?, ?, ?, 'trial', ?)
-                    """, (user_id, username, first_name, registration_date, trial_end))
+                    """, (user_id, username, first_name, now.isoformat(), trial_end.isoformat()))
                     await db.commit()
                     
                     # Проверяем, что данные сохранились
@@ -439,51 +687,68 @@ class Database:
             raise
     
     async def get_user(self, user_id: int):
-        """Получение данных пользователя"""
+        """Получение данных пользователя
+        
+        Одновременные запросы одного и того же user_id объединяются:
+        в базу уходит один SELECT, остальные корутины ждут его результат.
+        """
+        inflight = self._inflight_users.get(user_id)
+        if inflight is None:
+            # Загрузка идёт отдельной задачей: отмена одного из ожидающих её не отменяет
+            inflight = asyncio.get_running_loop().create_task(self._fetch_user(user_id))
+            self._inflight_users[user_id] = inflight
+            inflight.add_done_callback(functools.partial(self._forget_inflight_user, user_id))
+        return await asyncio.shield(inflight)
+    
+    def _forget_inflight_user(self, user_id: int, task: asyncio.Task):
+        """Убирает завершённую загрузку пользователя из объединяемых запросов"""
+        if self._inflight_users.get(user_id) is task:
+            del self._inflight_users[user_id]
+        if not task.cancelled():
+            task.exception()  # Ошибку получают ожидающие; если их не осталось - не логируем её как потерянную
+    
+    async def _fetch_user(self, user_id: int):
+        """Загрузка пользователя из базы данных"""
         if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_users")
+            sb = await self._get_supabase()
+            result = await (
+                sb.table("telegram_users")
                 .select("*")
                 .eq("user_id", user_id)
                 .limit(1)
                 .execute()
             )
-            return result.data[0] if result.data else None
-        if self.use_postgresql:
+            row = result.data[0] if result.data else None
+        elif self.use_postgresql:
             async with self._pg_connection_ctx() as conn:
-                row = await conn.fetchrow(
-                    "SELECT * FROM telegram_users WHERE user_id = $1", user_id
-                )
-                return row
+                row = await conn.fetchrow(_PG_GET_USER_SQL, user_id)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._sqlite_read() as db:
                 cursor = await db.execute(
                     "SELECT * FROM users WHERE user_id = ?", (user_id,)
                 )
-                return await cursor.fetchone()
+                row = await cursor.fetchone()
+        return self._normalize_user(row)
     
     async def update_user_birth_date(self, user_id: int, birth_date: str):
         """Обновление даты рождения пользователя"""
         if self.use_supabase_api:
-            await self._sb(
-                lambda: self._supabase.table("telegram_users")
+            sb = await self._get_supabase()
+            await (
+                sb.table("telegram_users")
                 .update({"birth_date": birth_date})
                 .eq("user_id", user_id)
                 .execute()
             )
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
+            async with self._pg_connection_ctx() as conn:
                 async with conn.transaction():
                     await conn.execute(
                         "UPDATE telegram_users SET birth_date = $1 WHERE user_id = $2",
                         birth_date, user_id
                     )
-            finally:
-                await self._release_pg_connection(conn)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._sqlite_write() as db:
                 await db.execute(
                     "UPDATE users SET birth_date = ? WHERE user_id = ?",
                     (birth_date, user_id)
@@ -492,41 +757,37 @@ class Database:
     
     async def save_calculation(self, user_id: int, calc_type: str, birth_date: str, result_data: str):
         """Сохранение результата расчета"""
+        calculation_date = datetime.now(timezone.utc)
         if self.use_supabase_api:
-            calculation_date = datetime.now().isoformat()
-            await self._sb(
-                lambda: self._supabase.table("telegram_calculations")
+            sb = await self._get_supabase()
+            await (
+                sb.table("telegram_calculations")
                 .insert(
                     {
                         "user_id": user_id,
                         "calculation_type": calc_type,
                         "birth_date": birth_date,
                         "result_data": result_data,
-                        "calculation_date": calculation_date,
+                        "calculation_date": calculation_date.isoformat(),
                     }
                 )
                 .execute()
             )
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                calculation_date = datetime.now()
+            async with self._pg_connection_ctx() as conn:
                 async with conn.transaction():
                     await conn.execute("""
                         INSERT INTO telegram_calculations 
                         (user_id, calculation_type, birth_date, result_data, calculation_date)
                         VALUES ($1, $2, $3, $4, $5)
                     """, user_id, calc_type, birth_date, result_data, calculation_date)
-            finally:
-                await self._release_pg_connection(conn)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                calculation_date = datetime.now().isoformat()
+            async with self._sqlite_write() as db:
                 await db.execute("""
                     INSERT INTO calculations 
                     (user_id, calculation_type, birth_date, result_data, calculation_date)
                     VALUES (?, ?, ?, ?, ?)
-                """, (user_id, calc_type, birth_date, result_data, calculation_date))
+                """, (user_id, calc_type, birth_date, result_data, calculation_date.isoformat()))
                 await db.commit()
     
     async def check_subscription(self, user_id: int) -> dict:
@@ -535,11 +796,9 @@ class Database:
         if not user:
             return {"active": False, "type": None}
         
-        if user['subscription_end_date']:
-            # PostgreSQL/Supabase возвращает datetime объект, SQLite - строку
-            end_date = self._parse_dt(user['subscription_end_date'])
-            
-            if datetime.now() < end_date:
+        end_date = user['subscription_end_date']  # get_user уже вернул datetime
+        if end_date:
+            if datetime.now(timezone.utc) < end_date:
                 return {
                     "active": True,
                     "type": user['subscription_type'],
@@ -551,7 +810,7 @@ class Database:
     async def add_gift_knowledge(self, gift_number: int, gift_name: str, 
                                  description: str, characteristics: str, category: str):
         """Добавление информации о даре в базу знаний"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._sqlite_write() as db:
             await db.execute("""
                 INSERT INTO gifts_knowledge 
                 (gift_number, gift_name, description, characteristics, category)
@@ -561,72 +820,125 @@ class Database:
     
     async def get_gift_knowledge(self, gift_number: int):
         """Получение информации о даре из базы знаний"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._sqlite_read() as db:
             cursor = await db.execute(
                 "SELECT * FROM gifts_knowledge WHERE gift_number = ?", (gift_number,)
             )
             return await cursor.fetchone()
     
     async def update_subscription(self, user_id: int, subscription_type: str, days: int):
-        """Обновление подписки пользователя"""
-        # Получаем текущую подписку
-        user = await self.get_user(user_id)
-        
-        # Если есть активная подписка, продлеваем от её окончания
-        # Иначе начинаем с текущего момента
-        if user and user.get('subscription_end_date'):
-            # PostgreSQL/Supabase возвращает datetime, SQLite - строку
-            current_end = self._parse_dt(user['subscription_end_date'])
-            if current_end > datetime.now():
-                new_end = current_end + timedelta(days=days)
-            else:
-                new_end = datetime.now() + timedelta(days=days)
-        else:
-            new_end = datetime.now() + timedelta(days=days)
+        """Обновление подписки пользователя
         
+        Если есть активная подписка, продлеваем от её окончания,
+        иначе начинаем с текущего момента. Новая дата окончания
+        вычисляется в самом UPDATE - одним запросом и без гонки
+        между чтением и записью.
+        """
         if self.use_supabase_api:
-            await self._sb(
-                lambda: self._supabase.table("telegram_users")
-                .update(
-                    {
-                        "subscription_type": subscription_type,
-                        "subscription_end_date": new_end.isoformat(),
-                    }
+            try:
+                sb = await self._get_supabase()
+                result = await (
+                    sb.rpc(
+                        "update_subscription",
+                        {
+                            "p_user_id": user_id,
+                            "p_subscription_type": subscription_type,
+                            "p_days": days,
+                        },
+                    ).execute()
                 )
-                .eq("user_id", user_id)
-                .execute()
-            )
+                new_end = self._parse_dt(result.data)
+            except Exception as e:
+                if not self._is_missing_rpc(e):
+                    raise
+                logger.warning("⚠️ Функция update_subscription не найдена в Supabase, обновляю подписку на клиенте")
+                new_end = await self._update_subscription_client_side(user_id, subscription_type, days)
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                async with conn.transaction():
-                    await conn.execute("""
-                        UPDATE telegram_users 
-                        SET subscription_type = $1, subscription_end_date = $2
-                        WHERE user_id = $3
-                    """, subscription_type, new_end, user_id)
-            finally:
-                await self._release_pg_connection(conn)
+            async with self._pg_connection_ctx() as conn:
+                new_end = await conn.fetchval("""
+                    UPDATE telegram_users 
+                    SET subscription_type = $1,
+                        subscription_end_date = GREATEST(COALESCE(subscription_end_date, NOW()), NOW())
+                            + make_interval(days => $2)
+                    WHERE user_id = $3
+                    RETURNING subscription_end_date
+                """, subscription_type, days, user_id)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._sqlite_write() as db:
+                now = datetime.now(timezone.utc).isoformat()
+                # datetime() приводит ISO-строки со смещением к UTC. Старые наивные значения -
+                # локальное время (как в _parse_dt), их переводим модификатором 'utc'.
+                # printf('%+d days') даёт и '+5 days', и '-5 days'. Результат сохраняем с '+00:00'
                 await db.execute("""
                     UPDATE users 
-                    SET subscription_type = ?, subscription_end_date = ?
+                    SET subscription_type = ?,
+                        subscription_end_date = strftime(
+                            '%Y-%m-%dT%H:%M:%S',
+                            MAX(
+                                COALESCE(
+                                    CASE
+                                        WHEN subscription_end_date GLOB '*[+-][0-9][0-9]:[0-9][0-9]'
+                                            OR subscription_end_date GLOB '*Z'
+                                        THEN datetime(subscription_end_date)
+                                        ELSE datetime(subscription_end_date, 'utc')
+                                    END,
+                                    datetime(?)
+                                ),
+                                datetime(?)
+                            ),
+                            printf('%+d days', ?)
+                        ) || '+00:00'
                     WHERE user_id = ?
-                """, (subscription_type, new_end.isoformat(), user_id))
+                """, (subscription_type, now, now, days, user_id))
                 await db.commit()
+                cursor = await db.execute(
+                    "SELECT subscription_end_date FROM users WHERE user_id = ?", (user_id,)
+                )
+                row = await cursor.fetchone()
+                new_end = self._parse_dt(row[0]) if row else None
+        
+        if new_end is None:
+            # Пользователя нет в базе - возвращаем срок от текущего момента, как и раньше
+            new_end = datetime.now(timezone.utc) + timedelta(days=days)
+        return new_end
+    
+    async def _update_subscription_client_side(self, user_id: int, subscription_type: str, days: int):
+        """Обновление подписки через REST API без SQL-функции (чтение + запись)"""
+        user = await self.get_user(user_id)
+        now = datetime.now(timezone.utc)
         
+        if user and user.get('subscription_end_date'):
+            current_end = user['subscription_end_date']
+            if current_end > now:
+                new_end = current_end + timedelta(days=days)
+            else:
+                new_end = now + timedelta(days=days)
+        else:
+            new_end = now + timedelta(days=days)
+        
+        sb = await self._get_supabase()
+        await (
+            sb.table("telegram_users")
+            .update(
+                {
+                    "subscription_type": subscription_type,
+                    "subscription_end_date": new_end.isoformat(),
+                }
+            )
+            .eq("user_id", user_id)
+            .execute()
+        )
         return new_end
     
     async def add_payment(self, user_id: int, amount: int, currency: str, 
                          subscription_type: str, status: str = 'completed'):
         """Добавление записи о платеже"""
-        payment_date = datetime.now()
+        payment_date = datetime.now(timezone.utc)
         
         if self.use_supabase_api:
-            await self._sb(
-                lambda: self._supabase.table("telegram_payments")
+            sb = await self._get_supabase()
+            await (
+                sb.table("telegram_payments")
                 .insert(
                     {
                         "user_id": user_id,
@@ -640,18 +952,15 @@ class Database:
                 .execute()
             )
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
+            async with self._pg_connection_ctx() as conn:
                 async with conn.transaction():
                     await conn.execute("""
                         INSERT INTO telegram_payments 
                         (user_id, amount, currency, payment_date, subscription_type, status)
                         VALUES ($1, $2, $3, $4, $5, $6)
                     """, user_id, amount, currency, payment_date, subscription_type, status)
-            finally:
-                await self._release_pg_connection(conn)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._sqlite_write() as db:
                 await db.execute("""
                     INSERT INTO payments 
                     (user_id, amount, currency, payment_date, subscription_type, status)
@@ -670,8 +979,7 @@ class Database:
                 """, user_id)
                 return rows
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._sqlite_read() as db:
                 cursor = await db.execute("""
                     SELECT * FROM payments 
                     WHERE user_id = ? 
@@ -682,34 +990,45 @@ class Database:
     async def get_subscription_stats(self):
         """Получение статистики по подпискам"""
         if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_users")
+            sb = await self._get_supabase()
+            try:
+                result = await sb.rpc("get_subscription_stats").execute()
+                return [
+                    (row.get("subscription_type") or "unknown", row["count"], row["active_count"])
+                    for row in result.data or []
+                ]
+            except Exception as e:
+                if not self._is_missing_rpc(e):
+                    raise
+                logger.warning("⚠️ Функция get_subscription_stats не найдена в Supabase, считаю статистику на клиенте")
+            result = await (
+                sb.table("telegram_users")
                 .select("subscription_type, subscription_end_date")
                 .execute()
             )
-            stats = {}
-            now = datetime.now()
+            counts = Counter()
+            actives = Counter()
+            now = datetime.now(timezone.utc)
             for row in result.data or []:
                 sub_type = row.get("subscription_type") or "unknown"
-                stats.setdefault(sub_type, {"count": 0, "active": 0})
-                stats[sub_type]["count"] += 1
+                counts[sub_type] += 1
                 end_date = self._parse_dt(row.get("subscription_end_date"))
                 if end_date and now < end_date:
-                    stats[sub_type]["active"] += 1
-            return [(k, v["count"], v["active"]) for k, v in stats.items()]
+                    actives[sub_type] += 1
+            return [(k, counts[k], actives[k]) for k in counts]
         if self.use_postgresql:
             async with self._pg_connection_ctx() as conn:
                 rows = await conn.fetch("""
                     SELECT 
                         subscription_type,
                         COUNT(*) as count,
-                        COUNT(CASE WHEN subscription_end_date > NOW() THEN 1 END) as active_count
+                        COUNT(*) FILTER (WHERE subscription_end_date > NOW()) as active_count
                     FROM telegram_users
                     GROUP BY subscription_type
                 """)
                 return rows
         else:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._sqlite_read() as db:
                 cursor = await db.execute("""
                     SELECT 
                         subscription_type,
@@ -720,23 +1039,52 @@ class Database:
                 """)
                 return await cursor.fetchall()
     
-    async def get_all_users_with_subscriptions(self, limit: int = 50):
-        """Получение списка пользователей с подписками"""
+    async def get_all_users_with_subscriptions(self, limit: int = 50, before: tuple = None):
+        """Получение списка пользователей с подписками
+        
+        Args:
+            limit: Размер страницы
+            before: Курсор страницы (keyset) - (registration_date, user_id) последнего
+                пользователя предыдущей страницы; None - первая страница
+        """
+        if before is not None:
+            before_date, before_user_id = before
+            # Курсор берётся из строки любого бэкенда: datetime или ISO-строка
+            before_date = self._parse_dt(before_date)
+        
         if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_users")
+            sb = await self._get_supabase()
+            query = (
+                sb.table("telegram_users")
                 .select(
                     "user_id, username, first_name, registration_date, "
                     "subscription_type, subscription_end_date, is_admin"
                 )
+            )
+            if before is not None:
+                # PostgREST не поддерживает сравнение кортежей - раскрываем его через or/and
+                before_iso = before_date.isoformat()
+                query = query.or_(
+                    f'registration_date.lt."{before_iso}",'
+                    f'and(registration_date.eq."{before_iso}",user_id.lt.{before_user_id})'
+                )
+            result = await (
+                query
                 .order("registration_date", desc=True)
+                .order("user_id", desc=True)
                 .limit(limit)
                 .execute()
             )
             return result.data
+        
+        # Курсор по (registration_date, user_id) вместо OFFSET: страница не пропускает
+        # предыдущие строки (в PostgreSQL - диапазон индекса idx_users_registration_date).
+        # user_id разделяет пользователей с одинаковой датой регистрации на границе страниц
         if self.use_postgresql:
+            where = "WHERE (registration_date, user_id) < ($1, $2)" if before is not None else ""
+            args = (before_date, before_user_id, limit) if before is not None else (limit,)
             async with self._pg_connection_ctx() as conn:
-                rows = await conn.fetch("""
+                rows = await conn.fetch(f"""
                     SELECT 
                         user_id,
                         username,
@@ -746,14 +1094,19 @@ class Database:
                         subscription_end_date,
                         is_admin
                     FROM telegram_users
-                    ORDER BY registration_date DESC
-                    LIMIT $1
-                """, limit)
+                    {where}
+                    ORDER BY registration_date DESC, user_id DESC
+                    LIMIT ${len(args)}
+                """, *args)
                 return rows
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute("""
+            # В SQLite даты - строки разных форматов (наивные локальные, со смещением), поэтому
+            # сравниваем и сортируем момент времени в UTC (julianday), а не текст
+            registered = _SQLITE_JULIANDAY_UTC_SQL.format(column="registration_date")
+            where = f"WHERE ({registered}, user_id) < (julianday(?), ?)" if before is not None else ""
+            args = (before_date.isoformat(), before_user_id, limit) if before is not None else (limit,)
+            async with self._sqlite_read() as db:
+                cursor = await db.execute(f"""
                     SELECT 
                         user_id,
                         username,
@@ -763,56 +1116,20 @@ class Database:
                         subscription_end_date,
                         is_admin
                     FROM users
-                    ORDER BY registration_date DESC
+                    {where}
+                    ORDER BY {registered} DESC, user_id DESC
                     LIMIT ?
-                """, (limit,))
+                """, args)
                 return await cursor.fetchall()
     
     async def init_alphabet_data(self):
         """Инициализация данных алфавита"""
-        logger = logging.getLogger(__name__)
-        alphabet_data = [
-            ("А", "Оду", "выбор обусловленный вас в точке внешне. Точка судьбы, точка отправления. Если А оформить в Оду - это О."),
-            ("Б", "Братья", "соединяющая, объединяющий."),
-            ("В", "Воздух", "трансляция, вышка. Как завывает ветер."),
-            ("Г", "Грани", "огранка, ограничивающая. Граница которая двигается. Тут много алхимических процессов."),
-            ("Д", "Дума", "обладает внешними границами. Потенциальная точка входа, которая обладает внешними границами. Есть нахальность и потенциальность. Развилка."),
-            ("Е", "", ""),
-            ("Ж", "Жизнь", "сила, рождающая жизнь"),
-            ("З", "Зета", "разрез, зеркало. Зевать. Процесс разделения. Как секира. Активно действует. Отрывающая. Я тебя срезал."),
-            ("И", "", "связь, вспомогательная, более подвижная связь. Если И возвести в Оду - получается Н."),
-            ("Й", "", "если И оплодотворить райдой. Более активное движение"),
-            ("К", "Кама", "кодировка. Кодировка в поле МА. Работаем где-то с потенциалом. С тем, чего еще не существует в принципе."),
-            ("Л", "Лота", "лезвие, разделяющий, линия. С твердыми, проявленными объектами. Отделить одно тело от другого. Работает еще и с Духом. Имеет выбор с чем работать. Вычерчивает границу от тебя. Отстаивания подвижных границ. Я устанавливаю правило границ"),
-            ("М", "Мана", "то что рождает выбор, создающий связи выбора. Мама рождает ребенка, который может родить еще одного ребенка. Одно рождает другое."),
-            ("Н", "Нита", "натянутая нить. Связи."),
-            ("О", "Ома", "если она присутствует - значит есть душа"),
-            ("П", "Приа", "портал, проникновение, пушка, поход, путешествие, поддержка. Портал, который С чем-то связывает. Связь с внешним объектом. П часто зависима. Она пропускает. Место куда мы идем зависит от места, где мы находимся. Выбор объекта, куда мы придем."),
-            ("Р", "Райда", "движение выбора связующее с внешним действием. Путь, стрела, толкающий. АКТИВНОСТЬ"),
-            ("С", "Сутра", "связующая. Что-то связующее с точкой, обладающее двигающим выбором. Одно синхронизировано с другим. Та что готова синхронизироваться. Провод от розетки"),
-            ("Т", "ТаАта", "тело. Сосуд, который имеет автоматический объект. Предмет. Не наделенное Духом. Наделить - Таата бра Ома."),
-            ("У", "", "точка входа"),
-            ("Ф", "Фата, фита", "КЛЮЧ. То, что открывает, вскрывает поле Ома, как ключом. Фа - подсознание, Фи - осознание. Фа - мы проникаем, фи - связываемся. Вверх активно, вниз нас ведут. Фата ты имеешь право выбора, а фита - выбора нет, за тебя выбирают."),
-            ("Х", "Храм", "то место, где начинается действие."),
-            ("Ц", "Циа", "возвышение. Энергия Ци. Подцепить, цеплять, цепь. Подхватывает из-под низа и поднимает наверх."),
-            ("Ч", "Чиа", "экосистемы, энергоцентр. Черта связующая с выбором. Кто-то провел черту от высших вниз. Кто-то сверху спустился вниз. Можно спускаться вниз. Как заземлитесь. Или провести черту. Черчение. Буква Л только с Божественной волей."),
-            ("Ш", "Ши", "внимание, внимание куда-либо стремится, связаться с чем-либо. Ши - это как руки к небу - энергия опускается через руки и попадает в ШишкУ."),
-            ("Щ", "", ""),
-            ("Ы", "", ""),
-            ("Э", "", ""),
-            ("Ю", "Юдл", "состоит из Й + У. Если И оплодотворить райдой + точка входа"),
-            ("Я", "ЙА", "состоит из Й + А. Если И оплодотворить райдой + Оду (точка судьбы, выбор)")
-        ]
-        
         if self.use_supabase_api:
             try:
-                payload = [
-                    {"letter": letter, "name": name, "description": description}
-                    for letter, name, description in alphabet_data
-                ]
-                await self._sb(
-                    lambda: self._supabase.table("telegram_alphabet")
-                    .upsert(payload, on_conflict="letter")
+                sb = await self._get_supabase()
+                await (
+                    sb.table("telegram_alphabet")
+                    .upsert(_ALPHABET_PAYLOAD, on_conflict="letter")
                     .execute()
                 )
             except Exception as e:
@@ -824,74 +1141,63 @@ class Database:
                     logger.error(f"❌ Ошибка при инициализации алфавита: {e}", exc_info=True)
                     raise
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                async with conn.transaction():
-                    for letter, name, description in alphabet_data:
-                        await conn.execute("""
-                            INSERT INTO telegram_alphabet (letter, name, description)
-                            VALUES ($1, $2, $3)
-                            ON CONFLICT (letter) DO NOTHING
-                        """, letter, name, description)
-            finally:
-                await self._release_pg_connection(conn)
+            async with self._pg_connection_ctx() as conn:
+                # executemany в asyncpg отправляет все строки конвейером и атомарен.
+                # COPY не подходит: нужен ON CONFLICT DO NOTHING для повторных запусков
+                await conn.executemany("""
+                    INSERT INTO telegram_alphabet (letter, name, description)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (letter) DO NOTHING
+                """, _ALPHABET_DATA)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                for letter, name, description in alphabet_data:
-                    await db.execute("""
-                        INSERT OR IGNORE INTO alphabet (letter, name, description)
-                        VALUES (?, ?, ?)
-                    """, (letter, name, description))
+            async with self._sqlite_write() as db:
+                await db.executemany("""
+                    INSERT OR IGNORE INTO alphabet (letter, name, description)
+                    VALUES (?, ?, ?)
+                """, _ALPHABET_DATA)
                 await db.commit()
+        
+        # Справочник мог измениться - перечитаем его при следующем обращении
+        self.invalidate_static_caches()
     
     async def get_letter_meaning(self, letter: str):
         """Получение значения буквы"""
-        if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_alphabet")
-                .select("*")
-                .eq("letter", letter.upper())
-                .limit(1)
-                .execute()
-            )
-            return result.data[0] if result.data else None
-        if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                row = await conn.fetchrow(
-                    "SELECT * FROM telegram_alphabet WHERE letter = $1", letter.upper()
-                )
-                return row
-            finally:
-                await self._release_pg_connection(conn)
-        else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
-                    "SELECT * FROM alphabet WHERE letter = ?", (letter.upper(),)
-                )
-                return await cursor.fetchone()
+        alphabet = await self._get_alphabet_cache()
+        return alphabet.get(letter.upper())
     
     async def get_all_alphabet(self):
         """Получение всего алфавита"""
+        await self._get_alphabet_cache()
+        return self._alphabet_list
+    
+    async def _get_alphabet_cache(self):
+        """Алфавит в памяти: справочник не меняется после init_alphabet_data, читаем его один раз"""
+        if self._alphabet_cache is None:
+            rows = [dict(row) for row in await self._load_alphabet()]
+            if not rows:
+                # Таблица ещё не заполнена - не кэшируем пустой результат
+                return {}
+            self._alphabet_list = rows
+            self._alphabet_cache = {row["letter"]: row for row in rows}
+        return self._alphabet_cache
+    
+    async def _load_alphabet(self):
+        """Загрузка всего алфавита из базы данных"""
         if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_alphabet")
+            sb = await self._get_supabase()
+            result = await (
+                sb.table("telegram_alphabet")
                 .select("*")
                 .order("id")
                 .execute()
             )
             return result.data
         if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
+            async with self._pg_connection_ctx() as conn:
                 rows = await conn.fetch("SELECT * FROM telegram_alphabet ORDER BY id")
                 return rows
-            finally:
-                await self._release_pg_connection(conn)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._sqlite_read() as db:
                 cursor = await db.execute("SELECT * FROM alphabet ORDER BY id")
                 return await cursor.fetchall()
     
@@ -899,121 +1205,71 @@ class Database:
     
     async def is_admin(self, user_id: int) -> bool:
         """Проверка прав администратора"""
-        user = await self.get_user(user_id)
-        if not user:
-            return False
-        # PostgreSQL возвращает boolean через asyncpg.Record, SQLite - integer через Row
-        # asyncpg.Record поддерживает доступ как к словарю
-        is_admin_value = user['is_admin']
-        if isinstance(is_admin_value, bool):
-            return is_admin_value
-        return is_admin_value == 1
+        if self.use_supabase_api:
+            sb = await self._get_supabase()
+            result = await (
+                sb.table("telegram_users")
+                .select("is_admin")
+                .eq("user_id", user_id)
+                .limit(1)
+                .execute()
+            )
+            value = result.data[0].get("is_admin") if result.data else None
+        elif self.use_postgresql:
+            async with self._pg_connection_ctx() as conn:
+                value = await conn.fetchval(_PG_IS_ADMIN_SQL, user_id)
+        else:
+            async with self._sqlite_read() as db:
+                cursor = await db.execute(
+                    "SELECT is_admin FROM users WHERE user_id = ?", (user_id,)
+                )
+                row = await cursor.fetchone()
+                value = row[0] if row else None
+        # PostgreSQL/REST API возвращают boolean, SQLite - integer
+        return bool(value)
     
     async def set_admin(self, user_id: int, is_admin: bool = True):
         """Выдать/снять права администратора"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
         try:
             if self.use_supabase_api:
-                existing = await self._sb(
-                    lambda: self._supabase.table("telegram_users")
-                    .select("user_id")
-                    .eq("user_id", user_id)
-                    .limit(1)
+                # Upsert: новый пользователь получает registration_date из DEFAULT NOW(),
+                # у существующего меняется только is_admin
+                sb = await self._get_supabase()
+                await (
+                    sb.table("telegram_users")
+                    .upsert({"user_id": user_id, "is_admin": is_admin}, on_conflict="user_id")
                     .execute()
                 )
-                if existing.data:
-                    await self._sb(
-                        lambda: self._supabase.table("telegram_users")
-                        .update({"is_admin": is_admin})
-                        .eq("user_id", user_id)
-                        .execute()
-                    )
-                else:
-                    registration_date = datetime.now().isoformat()
-                    await self._sb(
-                        lambda: self._supabase.table("telegram_users")
-                        .insert(
-                            {
-                                "user_id": user_id,
-                                "registration_date": registration_date,
-                                "is_admin": is_admin,
-                            }
-                        )
-                        .execute()
-                    )
                 logger.info(f"Права администратора для пользователя {user_id} успешно сохранены: {is_admin}")
             elif self.use_postgresql:
-                conn = await self._get_pg_connection()
-                try:
-                    # Проверяем, существует ли пользователь
-                    existing_user = await conn.fetchval(
-                        "SELECT user_id FROM telegram_users WHERE user_id = $1", user_id
-                    )
-                    
-                    if not existing_user:
-                        # Пользователь не существует - создаем его с правами администратора
-                        registration_date = datetime.now()
-                        logger.info(f"Создание нового пользователя {user_id} с правами администратора")
-                        async with conn.transaction():
-                            await conn.execute("""
-                                INSERT INTO telegram_users 
-                                (user_id, username, first_name, registration_date, is_admin)
-                                VALUES ($1, $2, $3, $4, $5)
-                            """, user_id, None, None, registration_date, is_admin)
-                    else:
-                        # Пользователь существует - обновляем права
-                        logger.info(f"Обновление прав администратора для пользователя {user_id}: {is_admin}")
-                        async with conn.transaction():
-                            await conn.execute(
-                                "UPDATE telegram_users SET is_admin = $1 WHERE user_id = $2",
-                                is_admin, user_id
-                            )
-                    
-                    # Проверяем, что изменения сохранились
-                    saved_is_admin = await conn.fetchval(
-                        "SELECT is_admin FROM telegram_users WHERE user_id = $1", user_id
-                    )
+                async with self._pg_connection_ctx() as conn:
+                    # Создаём пользователя или обновляем права одним запросом;
+                    # RETURNING подтверждает, что строка сохранена
+                    saved_is_admin = await conn.fetchval("""
+                        INSERT INTO telegram_users (user_id, registration_date, is_admin)
+                        VALUES ($1, $2, $3)
+                        ON CONFLICT (user_id) DO UPDATE SET is_admin = EXCLUDED.is_admin
+                        RETURNING is_admin
+                    """, user_id, datetime.now(timezone.utc), is_admin)
                     if saved_is_admin is None:
                         error_msg = f"Пользователь {user_id} не был сохранен в базу данных"
                         logger.error(error_msg)
                         raise Exception(error_msg)
                     
                     logger.info(f"Права администратора для пользователя {user_id} успешно сохранены: {is_admin}")
-                finally:
-                    await self._release_pg_connection(conn)
             else:
-                async with aiosqlite.connect(self.db_path) as db:
-                    # Устанавливаем настройки для надежной записи
-                    await db.execute("PRAGMA synchronous = NORMAL")
-                    
-                    # Проверяем, существует ли пользователь
-                    cursor = await db.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
-                    existing_user = await cursor.fetchone()
-                    
-                    if not existing_user:
-                        # Пользователь не существует - создаем его с правами администратора
-                        registration_date = datetime.now().isoformat()
-                        logger.info(f"Создание нового пользователя {user_id} с правами администратора")
-                        await db.execute("""
-                            INSERT INTO users 
-                            (user_id, username, first_name, registration_date, is_admin)
-                            VALUES (?, ?, ?, ?, ?)
-                        """, (user_id, None, None, registration_date, 1 if is_admin else 0))
-                    else:
-                        # Пользователь существует - обновляем права
-                        logger.info(f"Обновление прав администратора для пользователя {user_id}: {is_admin}")
-                        await db.execute(
-                            "UPDATE users SET is_admin = ? WHERE user_id = ?",
-                            (1 if is_admin else 0, user_id)
-                        )
+                async with self._sqlite_write() as db:
+                    # Создаём пользователя или обновляем права одним запросом;
+                    # прирост total_changes подтверждает, что строка записана
+                    changes_before = db.total_changes
+                    await db.execute("""
+                        INSERT INTO users (user_id, registration_date, is_admin)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(user_id) DO UPDATE SET is_admin = excluded.is_admin
+                    """, (user_id, datetime.now(timezone.utc).isoformat(), 1 if is_admin else 0))
                     await db.commit()
                     
-                    # Проверяем, что изменения сохранились
-                    cursor = await db.execute("SELECT is_admin FROM users WHERE user_id = ?", (user_id,))
-                    saved_user = await cursor.fetchone()
-                    if not saved_user:
+                    if db.total_changes == changes_before:
                         error_msg = f"Пользователь {user_id} не был сохранен в базу данных"
                         logger.error(error_msg)
                         raise Exception(error_msg)
@@ -1034,8 +1290,7 @@ class Database:
                 """)
                 return rows
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._sqlite_read() as db:
                 cursor = await db.execute(
                     "SELECT user_id, username, first_name FROM users WHERE is_admin = 1"
                 )
@@ -1057,14 +1312,12 @@ class Database:
             subscription_type: Тип подписки ('pro' или 'orden') для subscription промокодов
             max_uses: Максимальное количество использований (None = безлимит)
         """
-        import logging
-        logger = logging.getLogger(__name__)
-        
+        created_date = datetime.now(timezone.utc)
         try:
             if self.use_supabase_api:
-                created_date = datetime.now().isoformat()
-                result = await self._sb(
-                    lambda: self._supabase.table("telegram_promocodes")
+                sb = await self._get_supabase()
+                result = await (
+                    sb.table("telegram_promocodes")
                     .insert(
                         {
                             "code": code,
@@ -1073,7 +1326,7 @@ class Database:
                             "subscription_days": subscription_days,
                             "subscription_type": subscription_type,
                             "max_uses": max_uses,
-                            "created_date": created_date,
+                            "created_date": created_date.isoformat(),
                             "created_by": created_by,
                             "current_uses": 0,
                             "is_active": True,
@@ -1087,61 +1340,99 @@ class Database:
                 logger.info(f"Промокод {code} успешно создан с ID {promo.get('id')}")
             elif self.use_postgresql:
                 # PostgreSQL
-                conn = await self._get_pg_connection()
-                try:
-                    created_date = datetime.now()
-                    async with conn.transaction():
-                        promo_id = await conn.fetchval("""
-                            INSERT INTO telegram_promocodes 
-                            (code, type, discount_percent, subscription_days, subscription_type, max_uses, created_date, created_by)
-                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                            RETURNING id
-                        """, code, promo_type, discount_percent, subscription_days, subscription_type, max_uses, created_date, created_by)
-                    
-                    # Проверяем, что промокод действительно сохранен
-                    saved_promo = await conn.fetchrow(
-                        "SELECT id, code FROM telegram_promocodes WHERE id = $1", promo_id
+                async with self._pg_connection_ctx() as conn:
+                    # RETURNING id подтверждает запись - отдельная проверка не нужна
+                    promo_id = await conn.fetchval(
+                        _PG_INSERT_PROMOCODE_RETURNING_ID_SQL,
+                        code, promo_type, discount_percent, subscription_days, subscription_type, max_uses, created_date, created_by
                     )
-                    if not saved_promo:
-                        raise Exception(f"Промокод {code} не был сохранен в базу данных")
                     
                     logger.info(f"Промокод {code} успешно создан с ID {promo_id}")
-                finally:
-                    await self._release_pg_connection(conn)
             else:
                 # SQLite
-                async with aiosqlite.connect(self.db_path) as conn:
-                    # Устанавливаем настройки для надежной записи
-                    await conn.execute("PRAGMA synchronous = NORMAL")
-                    
-                    created_date = datetime.now().isoformat()
-                    cursor = await conn.execute("""
-                        INSERT INTO promocodes 
-                        (code, type, discount_percent, subscription_days, subscription_type, max_uses, created_date, created_by)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (code, promo_type, discount_percent, subscription_days, subscription_type, max_uses, created_date, created_by))
+                async with self._sqlite_write() as conn:
+                    cursor = await conn.execute(
+                        _SQLITE_INSERT_PROMOCODE_SQL,
+                        (code, promo_type, discount_percent, subscription_days, subscription_type, max_uses, created_date.isoformat(), created_by)
+                    )
                     await conn.commit()
                     
-                    # Получаем ID созданного промокода для проверки
+                    # ID созданного промокода (lastrowid подтверждает запись)
                     promo_id = cursor.lastrowid
                     
-                    # Проверяем, что промокод действительно сохранен
-                    check_cursor = await conn.execute("SELECT id, code FROM promocodes WHERE id = ?", (promo_id,))
-                    saved_promo = await check_cursor.fetchone()
-                    if not saved_promo:
-                        raise Exception(f"Промокод {code} не был сохранен в базу данных")
-                    
                     logger.info(f"Промокод {code} успешно создан с ID {promo_id}")
                 
         except Exception as e:
             logger.error(f"Ошибка при создании промокода {code}: {e}", exc_info=True)
             raise
     
+    async def create_promocodes_bulk(self, items):
+        """Массовое создание промокодов одним запросом
+        
+        Args:
+            items: Список dict с ключами как у create_promocode:
+                code, promo_type, created_by и необязательные discount_percent,
+                subscription_days, subscription_type, max_uses
+        """
+        if not items:
+            return
+        created_date = datetime.now(timezone.utc)
+        
+        if self.use_supabase_api:
+            sb = await self._get_supabase()
+            await (
+                sb.table("telegram_promocodes")
+                .insert(
+                    [
+                        {
+                            "code": item["code"],
+                            "type": item["promo_type"],
+                            "discount_percent": item.get("discount_percent"),
+                            "subscription_days": item.get("subscription_days"),
+                            "subscription_type": item.get("subscription_type"),
+                            "max_uses": item.get("max_uses"),
+                            "created_date": created_date.isoformat(),
+                            "created_by": item["created_by"],
+                            "current_uses": 0,
+                            "is_active": True,
+                        }
+                        for item in items
+                    ]
+                )
+                .execute()
+            )
+        elif self.use_postgresql:
+            async with self._pg_connection_ctx() as conn:
+                # executemany: одно подготовленное выражение, параметры отправляются конвейером
+                await conn.executemany(
+                    _PG_INSERT_PROMOCODE_SQL,
+                    [self._promocode_insert_params(item, created_date) for item in items]
+                )
+        else:
+            created_iso = created_date.isoformat()
+            async with self._sqlite_write() as db:
+                await db.executemany(
+                    _SQLITE_INSERT_PROMOCODE_SQL,
+                    [self._promocode_insert_params(item, created_iso) for item in items]
+                )
+                await db.commit()
+        logger.info(f"Создано промокодов: {len(items)}")
+    
+    @staticmethod
+    def _promocode_insert_params(item, created_date):
+        """Параметры INSERT промокода в порядке колонок _PG_/_SQLITE_INSERT_PROMOCODE_SQL"""
+        return (
+            item["code"], item["promo_type"], item.get("discount_percent"),
+            item.get("subscription_days"), item.get("subscription_type"),
+            item.get("max_uses"), created_date, item["created_by"],
+        )
+    
     async def get_promocode(self, code: str):
         """Получение промокода по коду"""
         if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_promocodes")
+            sb = await self._get_supabase()
+            result = await (
+                sb.table("telegram_promocodes")
                 .select("*")
                 .eq("code", code)
                 .eq("is_active", True)
@@ -1150,17 +1441,11 @@ class Database:
             )
             return result.data[0] if result.data else None
         if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                row = await conn.fetchrow(
-                    "SELECT * FROM telegram_promocodes WHERE code = $1 AND is_active = TRUE", code
-                )
+            async with self._pg_connection_ctx() as conn:
+                row = await conn.fetchrow(_PG_GET_PROMOCODE_SQL, code)
                 return row
-            finally:
-                await self._release_pg_connection(conn)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self._sqlite_read() as db:
                 cursor = await db.execute(
                     "SELECT * FROM promocodes WHERE code = ? AND is_active = 1", (code,)
                 )
@@ -1169,8 +1454,9 @@ class Database:
     async def check_user_used_promocode(self, user_id: int, promocode_id: int) -> bool:
         """Проверка, использовал ли пользователь промокод"""
         if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_promocode_usage")
+            sb = await self._get_supabase()
+            result = await (
+                sb.table("telegram_promocode_usage")
                 .select("id")
                 .eq("user_id", user_id)
                 .eq("promocode_id", promocode_id)
@@ -1179,83 +1465,53 @@ class Database:
             )
             return bool(result.data)
         if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                count = await conn.fetchval("""
-                    SELECT COUNT(*) FROM telegram_promocode_usage 
-                    WHERE user_id = $1 AND promocode_id = $2
-                """, user_id, promocode_id)
-                return count > 0
-            finally:
-                await self._release_pg_connection(conn)
+            async with self._pg_connection_ctx() as conn:
+                return await conn.fetchval(_PG_CHECK_PROMOCODE_USAGE_SQL, user_id, promocode_id)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._sqlite_read() as db:
                 cursor = await db.execute("""
-                    SELECT COUNT(*) as count FROM promocode_usage 
+                    SELECT 1 FROM promocode_usage 
                     WHERE user_id = ? AND promocode_id = ?
+                    LIMIT 1
                 """, (user_id, promocode_id))
-                result = await cursor.fetchone()
-                return result[0] > 0
+                return (await cursor.fetchone()) is not None
     
     async def use_promocode(self, user_id: int, promocode_id: int):
         """Зарегистрировать использование промокода"""
+        usage_date = datetime.now(timezone.utc)
         if self.use_supabase_api:
-            usage_date = datetime.now().isoformat()
-            await self._sb(
-                lambda: self._supabase.table("telegram_promocode_usage")
-                .insert(
-                    {
-                        "promocode_id": promocode_id,
-                        "user_id": user_id,
-                        "usage_date": usage_date,
-                    }
+            try:
+                # Запись использования и счётчик - одной SQL-функцией (атомарно, один запрос)
+                sb = await self._get_supabase()
+                await (
+                    sb.rpc(
+                        "use_promocode",
+                        {"p_promocode_id": promocode_id, "p_user_id": user_id},
+                    ).execute()
                 )
-                .execute()
-            )
-            current = await self._sb(
-                lambda: self._supabase.table("telegram_promocodes")
-                .select("current_uses")
-                .eq("id", promocode_id)
-                .limit(1)
-                .execute()
-            )
-            current_uses = 0
-            if current.data:
-                current_uses = current.data[0].get("current_uses") or 0
-            await self._sb(
-                lambda: self._supabase.table("telegram_promocodes")
-                .update({"current_uses": current_uses + 1})
-                .eq("id", promocode_id)
-                .execute()
-            )
+            except Exception as e:
+                if not self._is_missing_rpc(e):
+                    raise
+                logger.warning("⚠️ Функция use_promocode не найдена в Supabase, регистрирую использование на клиенте")
+                await self._use_promocode_client_side(user_id, promocode_id, usage_date)
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                usage_date = datetime.now()
-                
-                async with conn.transaction():
-                    # Добавляем запись об использовании
-                    await conn.execute("""
+            async with self._pg_connection_ctx() as conn:
+                # Добавляем запись об использовании и увеличиваем счетчик одним выражением
+                await conn.execute("""
+                    WITH usage AS (
                         INSERT INTO telegram_promocode_usage (promocode_id, user_id, usage_date)
                         VALUES ($1, $2, $3)
-                    """, promocode_id, user_id, usage_date)
-                    
-                    # Увеличиваем счетчик использований
-                    await conn.execute("""
-                        UPDATE telegram_promocodes SET current_uses = current_uses + 1
-                        WHERE id = $1
-                    """, promocode_id)
-            finally:
-                await self._release_pg_connection(conn)
+                    )
+                    UPDATE telegram_promocodes SET current_uses = current_uses + 1
+                    WHERE id = $1
+                """, promocode_id, user_id, usage_date)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                usage_date = datetime.now().isoformat()
-                
+            async with self._sqlite_write() as db:
                 # Добавляем запись об использовании
                 await db.execute("""
                     INSERT INTO promocode_usage (promocode_id, user_id, usage_date)
                     VALUES (?, ?, ?)
-                """, (promocode_id, user_id, usage_date))
+                """, (promocode_id, user_id, usage_date.isoformat()))
                 
                 # Увеличиваем счетчик использований
                 await db.execute("""
@@ -1265,26 +1521,55 @@ class Database:
                 
                 await db.commit()
     
+    async def _use_promocode_client_side(self, user_id: int, promocode_id: int, usage_date: datetime):
+        """Регистрация использования промокода через REST API без SQL-функции (3 запроса)"""
+        sb = await self._get_supabase()
+        await (
+            sb.table("telegram_promocode_usage")
+            .insert(
+                {
+                    "promocode_id": promocode_id,
+                    "user_id": user_id,
+                    "usage_date": usage_date.isoformat(),
+                }
+            )
+            .execute()
+        )
+        current = await (
+            sb.table("telegram_promocodes")
+            .select("current_uses")
+            .eq("id", promocode_id)
+            .limit(1)
+            .execute()
+        )
+        current_uses = 0
+        if current.data:
+            current_uses = current.data[0].get("current_uses") or 0
+        await (
+            sb.table("telegram_promocodes")
+            .update({"current_uses": current_uses + 1})
+            .eq("id", promocode_id)
+            .execute()
+        )
+    
     async def deactivate_promocode(self, code: str):
         """Деактивировать промокод"""
         if self.use_supabase_api:
-            await self._sb(
-                lambda: self._supabase.table("telegram_promocodes")
+            sb = await self._get_supabase()
+            await (
+                sb.table("telegram_promocodes")
                 .update({"is_active": False})
                 .eq("code", code)
                 .execute()
             )
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
+            async with self._pg_connection_ctx() as conn:
                 async with conn.transaction():
                     await conn.execute(
                         "UPDATE telegram_promocodes SET is_active = FALSE WHERE code = $1", code
                     )
-            finally:
-                await self._release_pg_connection(conn)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._sqlite_write() as db:
                 await db.execute(
                     "UPDATE promocodes SET is_active = 0 WHERE code = ?", (code,)
                 )
@@ -1292,258 +1577,169 @@ class Database:
     
     async def delete_promocode(self, promo_id: int):
         """Удалить промокод из базы данных"""
+        # Использования промокода удаляются каскадно: в PostgreSQL -
+        # FOREIGN KEY ... ON DELETE CASCADE (migrations/006), в SQLite - триггер
+        # trg_promocodes_delete_usage (SQLITE_SCHEMA_SQL)
         if self.use_supabase_api:
-            await self._sb(
-                lambda: self._supabase.table("telegram_promocode_usage")
-                .delete()
-                .eq("promocode_id", promo_id)
-                .execute()
-            )
-            await self._sb(
-                lambda: self._supabase.table("telegram_promocodes")
+            sb = await self._get_supabase()
+            await (
+                sb.table("telegram_promocodes")
                 .delete()
                 .eq("id", promo_id)
                 .execute()
             )
         elif self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                async with conn.transaction():
-                    # Сначала удаляем все использования промокода
-                    await conn.execute(
-                        "DELETE FROM telegram_promocode_usage WHERE promocode_id = $1", promo_id
-                    )
-                    # Затем удаляем сам промокод
-                    await conn.execute(
-                        "DELETE FROM telegram_promocodes WHERE id = $1", promo_id
-                    )
-            finally:
-                await self._release_pg_connection(conn)
-        else:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Сначала удаляем все использования промокода
-                await db.execute(
-                    "DELETE FROM promocode_usage WHERE promocode_id = ?", (promo_id,)
+            async with self._pg_connection_ctx() as conn:
+                await conn.execute(
+                    "DELETE FROM telegram_promocodes WHERE id = $1", promo_id
                 )
-                # Затем удаляем сам промокод
+        else:
+            async with self._sqlite_write() as db:
                 await db.execute(
                     "DELETE FROM promocodes WHERE id = ?", (promo_id,)
                 )
                 await db.commit()
     
     async def get_all_promocodes(self):
-        """Получить список всех промокодов"""
+        """Список всех промокодов (новые первыми)
+        
+        Асинхронный генератор: строки отдаются по мере чтения курсором,
+        без загрузки всей таблицы в память. Нужен список -
+        [p async for p in db.get_all_promocodes()].
+        """
         if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_promocodes")
+            sb = await self._get_supabase()
+            result = await (
+                sb.table("telegram_promocodes")
                 .select("*")
                 .order("created_date", desc=True)
                 .execute()
             )
-            return result.data
-        if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                rows = await conn.fetch("""
-                    SELECT * FROM telegram_promocodes ORDER BY created_date DESC
-                """)
-                return rows
-            finally:
-                await self._release_pg_connection(conn)
+            for row in result.data:
+                yield row
+        elif self.use_postgresql:
+            async with self._pg_connection_ctx() as conn:
+                # Серверный курсор asyncpg работает только внутри транзакции
+                async with conn.transaction():
+                    async for row in conn.cursor("""
+                        SELECT * FROM telegram_promocodes ORDER BY created_date DESC
+                    """):
+                        yield dict(row)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute("""
+            async with self._sqlite_read() as db:
+                async with db.execute("""
                     SELECT * FROM promocodes ORDER BY created_date DESC
-                """)
-                return await cursor.fetchall()
+                """) as cursor:
+                    async for row in cursor:
+                        yield dict(row)
     
     async def get_promocode_stats(self, code: str):
         """Получить статистику по промокоду"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            
-            # Получаем промокод
-            promo_cursor = await db.execute(
-                "SELECT * FROM promocodes WHERE code = ?", (code,)
-            )
-            promo = await promo_cursor.fetchone()
-            
-            if not promo:
-                return None
-            
-            # Получаем список использований
-            usage_cursor = await db.execute("""
-                SELECT u.username, u.first_name, pu.usage_date
-                FROM promocode_usage pu
-                JOIN users u ON pu.user_id = u.user_id
-                WHERE pu.promocode_id = ?
+        async with self._sqlite_read() as db:
+            # Промокод и его использования одним запросом: LEFT JOIN оставляет
+            # строку промокода и тогда, когда использований нет (usage_id IS NULL)
+            cursor = await db.execute("""
+                SELECT p.*, pu.id AS usage_id, u.username AS usage_username,
+                       u.first_name AS usage_first_name, pu.usage_date AS usage_date
+                FROM promocodes p
+                LEFT JOIN (promocode_usage pu JOIN users u ON pu.user_id = u.user_id)
+                    ON pu.promocode_id = p.id
+                WHERE p.code = ?
                 ORDER BY pu.usage_date DESC
-            """, (promo['id'],))
-            usage_list = await usage_cursor.fetchall()
-            
-            return {
-                'promocode': promo,
-                'usage_list': usage_list
+            """, (code,))
+            rows = await cursor.fetchall()
+        
+        if not rows:
+            return None
+        
+        usage_keys = ('usage_id', 'usage_username', 'usage_first_name', 'usage_date')
+        promo = {key: rows[0][key] for key in rows[0].keys() if key not in usage_keys}
+        usage_list = [
+            {
+                'username': row['usage_username'],
+                'first_name': row['usage_first_name'],
+                'usage_date': row['usage_date'],
             }
+            for row in rows
+            if row['usage_id'] is not None
+        ]
+        
+        return {
+            'promocode': promo,
+            'usage_list': usage_list
+        }
     
     # ========== АЛХИМИЯ ДАРОВ (МА-ЖИ-КУН ПОЗИЦИИ И ПОЛЯ) ==========
     
     async def init_ma_zhi_kun_data(self):
         """Инициализация данных позиций Ма-Жи-Кун"""
         positions_data = [
-            ("МА", "Мир непроявленного потенциала. Содержит идеи, желания, воспоминания — всё вне текущего фокуса внимания. Находится сзади/внутри. Соответствует будущему. Энергия: внутренний потенциал."),
-            ("ЖИ", "Мир проявленной реальности. Всё, что наблюдаем и ощущаем прямо сейчас: предметы, мысли, эмоции. Находится впереди/снаружи. Соответствует прошлому. Энергия: внешняя материальность."),
-            ("КУН", "Процесс творения и перехода между МА и ЖИ. Активный акт созидания в точке «здесь и сейчас». Осознанные действия и наблюдение. Находится посередине. Энергия: подвижная, творящая реальность.")
+            (position["name"], position["description"])
+            for position in MA_ZHI_KUN_POSITIONS.values()
         ]
         
         if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                async with conn.transaction():
-                    for name, description in positions_data:
-                        await conn.execute("""
-                            INSERT INTO telegram_ma_zhi_kun_positions (name, description)
-                            VALUES ($1, $2)
-                            ON CONFLICT (name) DO UPDATE SET description = $2
-                        """, name, description)
-            finally:
-                await self._release_pg_connection(conn)
+            async with self._pg_connection_ctx() as conn:
+                # executemany атомарен и отправляет строки конвейером
+                await conn.executemany("""
+                    INSERT INTO telegram_ma_zhi_kun_positions (name, description)
+                    VALUES ($1, $2)
+                    ON CONFLICT (name) DO UPDATE SET description = EXCLUDED.description
+                """, positions_data)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                for name, description in positions_data:
-                    await db.execute("""
-                        INSERT OR REPLACE INTO ma_zhi_kun_positions (name, description)
-                        VALUES (?, ?)
-                    """, (name, description))
+            async with self._sqlite_write() as db:
+                # Все строки в одной неявной транзакции, один commit
+                await db.executemany("""
+                    INSERT OR REPLACE INTO ma_zhi_kun_positions (name, description)
+                    VALUES (?, ?)
+                """, positions_data)
                 await db.commit()
     
     async def init_gift_fields_data(self):
         """Инициализация данных полей (1-9)"""
         fields_data = [
-            (1, "Логос", "Структура, архитектура пространства. Форма - треугольник. В теле: копчик. Вкус: соленый. Ощущение: сухой, сохраниние, поглощающий. Цвет: красный. Стихия: внутренняя Земля, сохраниение."),
-            (2, "Нима", "Пространство, бесконечность. В теле: таз, низ живота. Форма - пространство. Ощущение: мягкое, расширяющее. Цвет: голубой. Стихия: внутренний Воздух. Вкус: кислый."),
-            (3, "Андра", "Соединение и разьединение. В теле: живот, поясница. Ощущение: Острое, треск/надлом. Цвет: зелёный. Форма: ветвистость. Стихия: внутренняя Вода. Вкус: острый."),
-            (4, "Зингра", "Процесс горения и трансформации. Законы: необратимое изменение, испытание. В теле: солнечное сплетение. Ощущение: текстурное, стремлнение, изменяющий. Вкус: горький. Цвет: желтый. Стихия: внутренний Огонь. Драйв, смелость, сила прорыва, трансформация. Форма: спираль."),
-            (5, "Луба", "Солнце, центр. Форма - точка. В теле: сердечный центр. Ощущение: наполняющее, творение. Цвет: белый. Стихия: Внешний Огонь. Вкус: широкий. Дар: единство, стремление к точке, энергия, воля. "),
-            (6, "Тума", "Постоянное движение, синхронистичность, цикличность. В теле: грудная клетка. Ощущение: гладкое, притяжение, динамичный. Цвет: Синий, фиолетовый. Стихия: внешняя Вода (поток). Дар: Время, движение. Вкус: сладкий. Форма: волна."),
-            (7, "Астра", "Канал между мирами. Путь, канал. В теле: горло. Ощущение: влажное, связующий, пряный. Цвет: фиолетовый. Стихия: Внешний воздух. Связи, коммуникация, каналы между обьектами. Форма: линия."),
-            (8, "Битра", "Граница, форма, оболочка. В теле: лоб, третий глаз. Ощущение: твердое, обрамляющий, терпкий. Цвет: оранжевый. Стихия: внешняя Земля. Форма: круг."),
-            (9, "Ома", "Пробуждение центральной силы (Кундалини). Всё есть Одно, прямое переживание, трансценденция. В теле: позвоночник. Ощущение: восходящий поток, экстатическая полнота. Цвет: радужный. Стихия: Эфир. Целостность, просветление, активация. Форма - любая, так как содержит в себе все.")
+            (field["id"], field["name"], field["description"])
+            for field in GIFT_FIELDS.values()
         ]
         
         if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                async with conn.transaction():
-                    for field_id, name, description in fields_data:
-                        await conn.execute("""
-                            INSERT INTO telegram_gift_fields (id, name, description)
-                            VALUES ($1, $2, $3)
-                            ON CONFLICT (id) DO UPDATE SET name = $2, description = $3
-                        """, field_id, name, description)
-            finally:
-                await self._release_pg_connection(conn)
+            async with self._pg_connection_ctx() as conn:
+                # executemany атомарен и отправляет строки конвейером
+                await conn.executemany("""
+                    INSERT INTO telegram_gift_fields (id, name, description)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, description = EXCLUDED.description
+                """, fields_data)
         else:
-            async with aiosqlite.connect(self.db_path) as db:
-                for field_id, name, description in fields_data:
-                    await db.execute("""
-                        INSERT OR REPLACE INTO gift_fields (id, name, description)
-                        VALUES (?, ?, ?)
-                    """, (field_id, name, description))
+            async with self._sqlite_write() as db:
+                # Все строки в одной неявной транзакции, один commit
+                await db.executemany("""
+                    INSERT OR REPLACE INTO gift_fields (id, name, description)
+                    VALUES (?, ?, ?)
+                """, fields_data)
                 await db.commit()
     
+    def invalidate_static_caches(self):
+        """Сбрасывает кэш алфавита - перечитается из БД при следующем обращении"""
+        self._alphabet_cache = None
+    
+    # Позиции Ма-Жи-Кун и поля статичны (src/reference_data.py) - читаются без запросов к БД.
+    # Наружу отдаются копии, как раньше строки из БД: правка результата не меняет справочник
+    
     async def get_ma_zhi_kun_position(self, name: str):
         """Получение информации о позиции Ма-Жи-Кун"""
-        if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_ma_zhi_kun_positions")
-                .select("*")
-                .eq("name", name)
-                .limit(1)
-                .execute()
-            )
-            return result.data[0] if result.data else None
-        if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                row = await conn.fetchrow(
-                    "SELECT * FROM telegram_ma_zhi_kun_positions WHERE name = $1", name
-                )
-                return row
-            finally:
-                await self._release_pg_connection(conn)
-        else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
-                    "SELECT * FROM ma_zhi_kun_positions WHERE name = ?", (name,)
-                )
-                return await cursor.fetchone()
+        position = MA_ZHI_KUN_POSITIONS.get(name)
+        return dict(position) if position else None
     
     async def get_gift_field(self, field_id: int):
         """Получение информации о поле по ID"""
-        if self.use_supabase_api:
-            result = await self._sb(
-                lambda: self._supabase.table("telegram_gift_fields")
-                .select("*")
-                .eq("id", field_id)
-                .limit(1)
-                .execute()
-            )
-            return result.data[0] if result.data else None
-        if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                row = await conn.fetchrow(
-                    "SELECT * FROM telegram_gift_fields WHERE id = $1", field_id
-                )
-                return row
-            finally:
-                await self._release_pg_connection(conn)
-        else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
-                    "SELECT * FROM gift_fields WHERE id = ?", (field_id,)
-                )
-                return await cursor.fetchone()
+        field = GIFT_FIELDS.get(field_id)
+        return dict(field) if field else None
     
     async def get_all_ma_zhi_kun_positions(self):
         """Получение всех позиций Ма-Жи-Кун"""
-        if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                rows = await conn.fetch(
-                    "SELECT * FROM telegram_ma_zhi_kun_positions ORDER BY name"
-                )
-                return rows
-            finally:
-                await self._release_pg_connection(conn)
-        else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
-                    "SELECT * FROM ma_zhi_kun_positions ORDER BY name"
-                )
-                return await cursor.fetchall()
+        return [dict(position) for position in MA_ZHI_KUN_POSITIONS.values()]
     
     async def get_all_gift_fields(self):
         """Получение всех полей"""
-        if self.use_postgresql:
-            conn = await self._get_pg_connection()
-            try:
-                rows = await conn.fetch(
-                    "SELECT * FROM telegram_gift_fields ORDER BY id"
-                )
-                return rows
-            finally:
-                await self._release_pg_connection(conn)
-        else:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
-                    "SELECT * FROM gift_fields ORDER BY id"
-                )
-                return await cursor.fetchall()
-
+        return [dict(field) for field in GIFT_FIELDS.values()]
@@ -3,9 +3,46 @@
 Создание и анализ сантр на основе команд и даров
 """
 import random
-from src.commands import get_commands_by_position, get_command_info
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from src.commands import get_commands_by_position, get_all_commands
 from src.gifts_knowledge import get_all_gifts, get_gift_info
 
+# Префиксы и символы, которые normalize_gift_name убирает из имени дара
+_PREFIX_RE = re.compile(r"старший ?дар|дар")
+_STRIP_TABLE = str.maketrans("", "", " -")
+# Префикс, который убирается из имени дара при выводе в тексте сантры
+_GIFT_PREFIX_STRIP = re.compile(r"^(старший дар - |дар )")
+
+# Индекс для find_gift_by_name (см. _get_gift_index); None - ещё не построен
+_GIFT_INDEX = None
+# Индекс команд без учёта регистра для parse_mantra (см. _get_command_index)
+_COMMAND_INDEX = None
+
+# Справочники команд и даров не меняются во время работы - выбираем из готовых кортежей
+_START_COMMANDS = tuple(get_commands_by_position("начало"))
+_BETWEEN_COMMANDS = tuple(get_commands_by_position("между"))
+_END_COMMANDS = tuple(get_commands_by_position("конец"))
+_GIFT_ITEMS = tuple(get_all_gifts().items())
+
+# Кэш create_mantra_by_request: {(вопрос, число даров, конец): (истекает_в, сантра)}.
+# Повторные нажатия с тем же вопросом в течение TTL получают ту же сантру
+_MANTRA_CACHE = OrderedDict()
+_MANTRA_CACHE_SIZE = 128
+_MANTRA_CACHE_TTL = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class GiftHit:
+    """Найденный дар (результат find_gift_by_name), создаётся один раз на дар в индексе"""
+    code: str
+    name: str
+    description: str
+    ma_ji_kun: str
+
 
 def normalize_gift_name(gift_name: str) -> str:
     """
@@ -18,18 +55,16 @@ def normalize_gift_name(gift_name: str) -> str:
     Returns:
         Нормализованное имя (например, "мана" или "мира")
     """
-    # Убираем "старший дар", "дар", пробелы, дефисы, приводим к нижнему регистру
-    normalized = gift_name.lower()
-    normalized = normalized.replace("старший дар", "")
-    normalized = normalized.replace("старшийдар", "")
-    normalized = normalized.replace("дар", "")
-    normalized = normalized.replace(" ", "")
-    normalized = normalized.replace("-", "")
-    normalized = normalized.strip()
-    return normalized
-
-
-def find_gift_by_name(gift_name: str) -> dict:
+    # Убираем "старший дар", "дар" (одним проходом регулярки), затем пробелы и дефисы
+    return _PREFIX_RE.sub("", gift_name.lower()).translate(_STRIP_TABLE).strip()
+
+
+def _display_gift_name(gift_name: str) -> str:
+    """Имя дара для текста сантры: без префикса "дар " / "старший дар - " ("дар Ма-На" -> "Ма-На")"""
+    return _GIFT_PREFIX_STRIP.sub("", gift_name)
+
+
+def find_gift_by_name(gift_name: str) -> Optional[GiftHit]:
     """
     Поиск дара по имени (с учетом нормализации)
     
@@ -37,22 +72,65 @@ def find_gift_by_name(gift_name: str) -> dict:
         gift_name: Имя дара для поиска
     
     Returns:
-        Словарь с информацией о даре или пустой словарь
+        GiftHit с информацией о даре или None
     """
-    normalized_search = normalize_gift_name(gift_name)
-    all_gifts = get_all_gifts()
-    
-    # Ищем по нормализованному имени в названиях даров
-    for gift_code, gift_data in all_gifts.items():
-        gift_name_in_db = gift_data.get("name", "")
-        normalized_db_name = normalize_gift_name(gift_name_in_db)
-        
-        if normalized_search == normalized_db_name:
-            result = gift_data.copy()
-            result["code"] = gift_code
-            return result
+    return _get_gift_index().get(normalize_gift_name(gift_name))
+
+
+def _get_gift_index() -> dict:
+    """Индекс даров {нормализованное имя: GiftHit}, строится один раз при первом поиске"""
+    global _GIFT_INDEX
+    if _GIFT_INDEX is None:
+        index = {}
+        for gift_code, gift_data in get_all_gifts().items():
+            name = gift_data.get("name", "")
+            # setdefault: при совпадении имён побеждает первый дар, как и при линейном поиске
+            index.setdefault(normalize_gift_name(name), GiftHit(
+                code=gift_code,
+                name=name,
+                description=gift_data.get("description", ""),
+                ma_ji_kun=gift_data.get("ma_ji_kun", ""),
+            ))
+        _GIFT_INDEX = index
+    return _GIFT_INDEX
+
+
+def _get_command_index() -> dict:
+    """Индекс {имя команды в нижнем регистре: данные команды}
     
-    return {}
+    Сопоставление то же, что у get_command_info: точное имя или имя без учёта
+    регистра (при совпадении побеждает первая команда справочника).
+    """
+    global _COMMAND_INDEX
+    if _COMMAND_INDEX is None:
+        index = {}
+        for cmd_name, cmd_data in get_all_commands().items():
+            index.setdefault(cmd_name.lower(), cmd_data)
+        _COMMAND_INDEX = index
+    return _COMMAND_INDEX
+
+
+def _find_command(name: str):
+    """Данные команды по имени (как get_command_info) или None"""
+    return get_all_commands().get(name) or _get_command_index().get(name.lower())
+
+
+def _build_element(kind: str, payload) -> dict:
+    """Элемент сантры для parse_mantra: kind - "команда" (данные команды) или "дар" (GiftHit)"""
+    if kind == "команда":
+        return {
+            "type": "команда",
+            "name": payload["имя"],
+            "description": payload["описание"],
+            "position": payload["позиция"][0] if payload["позиция"] else "неизвестно"
+        }
+    return {
+        "type": "дар",
+        "name": payload.name,
+        "code": payload.code,
+        "description": payload.description,
+        "ma_ji_kun": payload.ma_ji_kun
+    }
 
 
 def create_mantra_random(num_gifts: int = 1, include_end: bool = False) -> dict:
@@ -78,20 +156,15 @@ def create_mantra_random(num_gifts: int = 1, include_end: bool = False) -> dict:
     if num_gifts not in [1, 2]:
         num_gifts = 1
     
-    # Получаем команды по позициям
-    start_commands = get_commands_by_position("начало")
-    between_commands = get_commands_by_position("между")
-    end_commands = get_commands_by_position("конец")
-    
-    # Получаем все дары
-    all_gifts = get_all_gifts()
-    gift_list = list(all_gifts.items())
-    
-    if not start_commands or not between_commands or not gift_list:
+    if not _START_COMMANDS or not _BETWEEN_COMMANDS or not _GIFT_ITEMS:
         return {"error": "Недостаточно данных для создания сантры"}
     
-    # Выбираем случайные элементы
-    start_cmd = random.choice(start_commands)
+    add_end = include_end and bool(_END_COMMANDS)
+    # Все случайные элементы выбираем сразу: по одному вызову random.choices на категорию
+    between_cmds = random.choices(_BETWEEN_COMMANDS, k=num_gifts + add_end)
+    gifts = random.choices(_GIFT_ITEMS, k=num_gifts)
+    
+    start_cmd = random.choice(_START_COMMANDS)
     mantra_parts = [start_cmd["имя"]]
     elements = [{
         "type": "команда",
@@ -101,9 +174,8 @@ def create_mantra_random(num_gifts: int = 1, include_end: bool = False) -> dict:
     }]
     
     # Добавляем дары с командами "между"
-    for i in range(num_gifts):
+    for between_cmd, (gift_code, gift_data) in zip(between_cmds, gifts):
         # Команда "между" перед даром
-        between_cmd = random.choice(between_commands)
         mantra_parts.append(between_cmd["имя"])
         elements.append({
             "type": "команда",
@@ -113,15 +185,8 @@ def create_mantra_random(num_gifts: int = 1, include_end: bool = False) -> dict:
         })
         
         # Дар
-        gift_code, gift_data = random.choice(gift_list)
         gift_name = gift_data.get("name", "")
-        # Убираем префиксы "дар " и "старший дар - "
-        clean_name = gift_name
-        if "старший дар - " in clean_name:
-            clean_name = clean_name.replace("старший дар - ", "")
-        elif "дар " in clean_name:
-            clean_name = clean_name.replace("дар ", "")
-        mantra_parts.append(clean_name)
+        mantra_parts.append(_display_gift_name(gift_name))
         elements.append({
             "type": "дар",
             "name": gift_name,
@@ -131,9 +196,9 @@ def create_mantra_random(num_gifts: int = 1, include_end: bool = False) -> dict:
         })
     
     # Если нужно добавить "конец"
-    if include_end and end_commands:
+    if add_end:
         # Команда "между" перед "конец"
-        between_cmd = random.choice(between_commands)
+        between_cmd = between_cmds[-1]
         mantra_parts.append(between_cmd["имя"])
         elements.append({
             "type": "команда",
@@ -143,7 +208,7 @@ def create_mantra_random(num_gifts: int = 1, include_end: bool = False) -> dict:
         })
         
         # Команда "конец"
-        end_cmd = random.choice(end_commands)
+        end_cmd = random.choice(_END_COMMANDS)
         mantra_parts.append(end_cmd["имя"])
         elements.append({
             "type": "команда",
@@ -174,8 +239,21 @@ def create_mantra_by_request(user_question: str, num_gifts: int = 1, include_end
     Returns:
         Словарь с информацией о сантре (пока использует случайный выбор)
     """
+    key = (user_question, num_gifts, include_end)
+    now = time.monotonic()
+    cached = _MANTRA_CACHE.get(key)
+    if cached is not None and cached[0] > now:
+        _MANTRA_CACHE.move_to_end(key)
+        return cached[1]
+    
     # Пока используем случайный выбор, но можно добавить логику на основе вопроса
-    return create_mantra_random(num_gifts, include_end)
+    result = create_mantra_random(num_gifts, include_end)
+    if "error" not in result:
+        _MANTRA_CACHE[key] = (now + _MANTRA_CACHE_TTL, result)
+        _MANTRA_CACHE.move_to_end(key)
+        if len(_MANTRA_CACHE) > _MANTRA_CACHE_SIZE:
+            _MANTRA_CACHE.popitem(last=False)
+    return result
 
 
 def parse_mantra(mantra_text: str) -> dict:
@@ -204,27 +282,16 @@ def parse_mantra(mantra_text: str) -> dict:
         if not part:
             continue
         
-        # Пытаемся найти команду
-        cmd_info = get_command_info(part)
+        # Пытаемся найти команду (точное имя или без учёта регистра)
+        cmd_info = _find_command(part)
         if cmd_info:
-            elements.append({
-                "type": "команда",
-                "name": cmd_info["имя"],
-                "description": cmd_info["описание"],
-                "position": cmd_info["позиция"][0] if cmd_info["позиция"] else "неизвестно"
-            })
+            elements.append(_build_element("команда", cmd_info))
             continue
         
         # Пытаемся найти дар
-        gift_info = find_gift_by_name(part)
-        if gift_info:
-            elements.append({
-                "type": "дар",
-                "name": gift_info.get("name", ""),
-                "code": gift_info.get("code", ""),
-                "description": gift_info.get("description", ""),
-                "ma_ji_kun": gift_info.get("ma_ji_kun", "")
-            })
+        gift = find_gift_by_name(part)
+        if gift:
+            elements.append(_build_element("дар", gift))
             continue
         
         # Если не найдено ни команды, ни дара
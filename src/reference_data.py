@@ -0,0 +1,69 @@
+"""
+Справочники алхимии даров: позиции Ма-Жи-Кун и поля (1-9)
+Данные статичны: бот читает их отсюда, таблицы в БД только заполняются ими (init_*_data)
+"""
+
+# Позиции Ма-Жи-Кун по имени
+MA_ZHI_KUN_POSITIONS = {
+    "МА": {
+        "name": "МА",
+        "description": "Мир непроявленного потенциала. Содержит идеи, желания, воспоминания — всё вне текущего фокуса внимания. Находится сзади/внутри. Соответствует будущему. Энергия: внутренний потенциал."
+    },
+    "ЖИ": {
+        "name": "ЖИ",
+        "description": "Мир проявленной реальности. Всё, что наблюдаем и ощущаем прямо сейчас: предметы, мысли, эмоции. Находится впереди/снаружи. Соответствует прошлому. Энергия: внешняя материальность."
+    },
+    "КУН": {
+        "name": "КУН",
+        "description": "Процесс творения и перехода между МА и ЖИ. Активный акт созидания в точке «здесь и сейчас». Осознанные действия и наблюдение. Находится посередине. Энергия: подвижная, творящая реальность."
+    }
+}
+
+# Поля по номеру
+GIFT_FIELDS = {
+    1: {
+        "id": 1,
+        "name": "Логос",
+        "description": "Структура, архитектура пространства. Форма - треугольник. В теле: копчик. Вкус: соленый. Ощущение: сухой, сохраниние, поглощающий. Цвет: красный. Стихия: внутренняя Земля, сохраниение."
+    },
+    2: {
+        "id": 2,
+        "name": "Нима",
+        "description": "Пространство, бесконечность. В теле: таз, низ живота. Форма - пространство. Ощущение: мягкое, расширяющее. Цвет: голубой. Стихия: внутренний Воздух. Вкус: кислый."
+    },
+    3: {
+        "id": 3,
+        "name": "Андра",
+        "description": "Соединение и разьединение. В теле: живот, поясница. Ощущение: Острое, треск/надлом. Цвет: зелёный. Форма: ветвистость. Стихия: внутренняя Вода. Вкус: острый."
+    },
+    4: {
+        "id": 4,
+        "name": "Зингра",
+        "description": "Процесс горения и трансформации. Законы: необратимое изменение, испытание. В теле: солнечное сплетение. Ощущение: текстурное, стремлнение, изменяющий. Вкус: горький. Цвет: желтый. Стихия: внутренний Огонь. Драйв, смелость, сила прорыва, трансформация. Форма: спираль."
+    },
+    5: {
+        "id": 5,
+        "name": "Луба",
+        "description": "Солнце, центр. Форма - точка. В теле: сердечный центр. Ощущение: наполняющее, творение. Цвет: белый. Стихия: Внешний Огонь. Вкус: широкий. Дар: единство, стремление к точке, энергия, воля. "
+    },
+    6: {
+        "id": 6,
+        "name": "Тума",
+        "description": "Постоянное движение, синхронистичность, цикличность. В теле: грудная клетка. Ощущение: гладкое, притяжение, динамичный. Цвет: Синий, фиолетовый. Стихия: внешняя Вода (поток). Дар: Время, движение. Вкус: сладкий. Форма: волна."
+    },
+    7: {
+        "id": 7,
+        "name": "Астра",
+        "description": "Канал между мирами. Путь, канал. В теле: горло. Ощущение: влажное, связующий, пряный. Цвет: фиолетовый. Стихия: Внешний воздух. Связи, коммуникация, каналы между обьектами. Форма: линия."
+    },
+    8: {
+        "id": 8,
+        "name": "Битра",
+        "description": "Граница, форма, оболочка. В теле: лоб, третий глаз. Ощущение: твердое, обрамляющий, терпкий. Цвет: оранжевый. Стихия: внешняя Земля. Форма: круг."
+    },
+    9: {
+        "id": 9,
+        "name": "Ома",
+        "description": "Пробуждение центральной силы (Кундалини). Всё есть Одно, прямое переживание, трансценденция. В теле: позвоночник. Ощущение: восходящий поток, экстатическая полнота. Цвет: радужный. Стихия: Эфир. Целостность, просветление, активация. Форма - любая, так как содержит в себе все."
+    }
+}
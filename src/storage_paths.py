@@ -0,0 +1,24 @@
+"""
+Пути к локальным файлам хранилища (SQLite и маркер проверенной схемы)
+Модуль без зависимостей от Config: его используют и бот, и скрипты миграций,
+которым не нужен BOT_TOKEN
+"""
+import os
+
+
+def is_vercel() -> bool:
+    """Запуск на Vercel (файловая система доступна для записи только в /tmp)"""
+    return bool(os.getenv('VERCEL') or os.getenv('VERCEL_ENV'))
+
+
+def get_database_path() -> str:
+    """Путь к базе SQLite: DATABASE_PATH или значение по умолчанию для платформы"""
+    default_db_path = '/tmp/bot_database.db' if is_vercel() else 'data/bot_database.db'
+    return os.getenv('DATABASE_PATH', default_db_path)
+
+
+def get_schema_marker_path(database_path: str = None) -> str:
+    """Файл-маркер успешной проверки схемы PostgreSQL - рядом с базой SQLite"""
+    if database_path is None:
+        database_path = get_database_path()
+    return os.path.join(os.path.dirname(database_path) or '.', '.schema_ok')
@@ -0,0 +1,9 @@
+-- Составные индексы для истории платежей и расчетов пользователя
+-- get_user_payments: WHERE user_id = $1 ORDER BY payment_date DESC (index-only scan без сортировки)
+
+CREATE INDEX IF NOT EXISTS idx_payments_user_date
+    ON telegram_payments(user_id, payment_date DESC)
+    INCLUDE (amount, currency, subscription_type, status);
+
+CREATE INDEX IF NOT EXISTS idx_calculations_user_date
+    ON telegram_calculations(user_id, calculation_date DESC);
@@ -0,0 +1,15 @@
+-- Атомарное продление подписки одним запросом
+-- Используется REST API веткой Database.update_subscription через /rest/v1/rpc/update_subscription
+
+CREATE OR REPLACE FUNCTION update_subscription(p_user_id BIGINT, p_subscription_type TEXT, p_days INTEGER)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql
+VOLATILE
+AS $$
+    UPDATE telegram_users
+    SET subscription_type = p_subscription_type,
+        subscription_end_date = GREATEST(COALESCE(subscription_end_date, NOW()), NOW())
+            + make_interval(days => p_days)
+    WHERE user_id = p_user_id
+    RETURNING subscription_end_date;
+$$;
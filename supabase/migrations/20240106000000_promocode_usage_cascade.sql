@@ -0,0 +1,10 @@
+-- Каскадное удаление использований вместе с промокодом
+-- Database.delete_promocode удаляет только строку из telegram_promocodes.
+-- Пересоздаём внешний ключ на случай, если таблица была создана без ON DELETE CASCADE
+
+ALTER TABLE telegram_promocode_usage
+    DROP CONSTRAINT IF EXISTS telegram_promocode_usage_promocode_id_fkey;
+
+ALTER TABLE telegram_promocode_usage
+    ADD CONSTRAINT telegram_promocode_usage_promocode_id_fkey
+    FOREIGN KEY (promocode_id) REFERENCES telegram_promocodes(id) ON DELETE CASCADE;
@@ -0,0 +1,15 @@
+-- Индексы под частые запросы админки и промокодов
+-- check_user_used_promocode: WHERE user_id = $1 AND promocode_id = $2 (index-only scan)
+-- Индекс не уникальный: в существующих базах уже могут быть повторные использования
+CREATE INDEX IF NOT EXISTS idx_promocode_usage_user_promo
+    ON telegram_promocode_usage(user_id, promocode_id);
+
+-- get_all_users_with_subscriptions: ORDER BY registration_date DESC LIMIT $1 (без сортировки)
+CREATE INDEX IF NOT EXISTS idx_users_registration_date
+    ON telegram_users(registration_date DESC);
+
+-- get_all_admins: WHERE is_admin = TRUE (маленький частичный индекс)
+CREATE INDEX IF NOT EXISTS idx_users_admin
+    ON telegram_users(user_id) WHERE is_admin;
+
+-- get_promocode (WHERE code = $1 AND is_active) уже обслуживается уникальным индексом по code
@@ -0,0 +1,14 @@
+-- Список таблиц схемы public одним запросом
+-- Используется tests/test_supabase_connection.py через /rest/v1/rpc/list_public_tables
+-- вместо отдельного запроса к каждой таблице
+
+CREATE OR REPLACE FUNCTION list_public_tables()
+RETURNS TABLE (table_name TEXT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT t.table_name::TEXT
+    FROM information_schema.tables t
+    WHERE t.table_schema = 'public'
+    ORDER BY t.table_name;
+$$;
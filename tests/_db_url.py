@@ -0,0 +1,42 @@
+"""
+Разбор строки подключения PostgreSQL для тестовых скриптов
+URL разбирается один раз: из одного urlparse получаются и маскированный URL для вывода,
+и URL с закодированным паролем для подключения
+"""
+import re
+from urllib.parse import quote_plus, urlparse
+
+# Хосты Supabase: прямое подключение (db.<ref>.supabase.co) или пулер (pooler.supabase.com)
+_DB_URL_RE = re.compile(r'db\.[\w-]+\.supabase\.co|pooler\.supabase\.com')
+
+
+def db_url_kind(url: str):
+    """Тип строки подключения Supabase: 'direct', 'pool' или None для нестандартного URL"""
+    m = _DB_URL_RE.search(url)
+    if not m:
+        return None
+    return 'direct' if m.group().startswith('db.') else 'pool'
+
+
+def normalize_db_url(url: str):
+    """Возвращает (masked, encoded, parsed)
+    
+    masked - URL без пароля и параметров, для вывода в консоль;
+    encoded - URL для подключения, пароль закодирован (если ещё не был);
+    parsed - результат urlparse исходного URL
+    """
+    parsed = urlparse(url)
+    userinfo, at, host = parsed.netloc.rpartition('@')
+    if not at:
+        return url[:80], url, parsed
+    
+    username, colon, password = userinfo.partition(':')
+    if not colon:
+        masked = f"{parsed.scheme}://***@{host}{parsed.path}"
+        return masked, url, parsed
+    
+    masked = f"{parsed.scheme}://{username}:***@{host}{parsed.path}"
+    # Уже закодированный пароль (%XX) не кодируем повторно
+    encoded_password = password if '%' in password else quote_plus(password, safe='')
+    encoded = parsed._replace(netloc=f"{username}:{encoded_password}@{host}").geturl()
+    return masked, encoded, parsed
@@ -0,0 +1,52 @@
+"""
+Общее окружение для тестовых скриптов
+.env разбирается один раз на процесс, повторные вызовы get_env() возвращают готовый dict.
+Если есть актуальный tests/env_compiled.py (см. compile_env.py), .env не разбирается вовсе
+"""
+import os
+from dotenv import dotenv_values, find_dotenv
+
+COMPILED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'env_compiled.py')
+
+_cached = None
+
+
+def find_env_path() -> str:
+    """Абсолютный путь к .env (поиск от текущего каталога вверх) или '' если файла нет"""
+    dotenv_path = find_dotenv(usecwd=True)
+    return os.path.abspath(dotenv_path) if dotenv_path else ''
+
+
+def _load_compiled(dotenv_path: str):
+    """Значения из env_compiled.py, если модуль собран из этого же .env и не раньше его изменения"""
+    if not dotenv_path or not os.path.exists(COMPILED_PATH):
+        return None
+    if os.path.getmtime(dotenv_path) > os.path.getmtime(COMPILED_PATH):
+        return None
+    try:
+        import env_compiled
+    except ImportError:
+        return None
+    if env_compiled.DOTENV_PATH != dotenv_path:
+        return None
+    return env_compiled.ENV
+
+
+def get_env() -> dict:
+    """Переменные окружения с учетом .env (как load_dotenv: уже заданные в окружении важнее)"""
+    global _cached
+    if _cached is None:
+        dotenv_path = find_env_path()
+        env = _load_compiled(dotenv_path)
+        if env is None:
+            env = {}
+            if dotenv_path:
+                env = {key: value for key, value in dotenv_values(dotenv_path).items() if value is not None}
+                if os.path.exists(COMPILED_PATH):
+                    # Модуль устарел или собран из другого .env - пересобираем для следующих запусков
+                    from compile_env import compile_env
+                    compile_env(dotenv_path)
+        env = dict(env)
+        env.update(os.environ)
+        _cached = env
+    return _cached
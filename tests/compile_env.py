@@ -0,0 +1,28 @@
+"""
+Компиляция .env в модуль tests/env_compiled.py
+Запуск: python tests/compile_env.py
+После этого тестовые скрипты берут переменные из импортируемого модуля (с кэшем .pyc),
+а не разбирают .env заново. Устаревший модуль (.env изменен позже) get_env() не использует и пересобирает.
+Файл содержит секреты из .env и не должен попадать в git (см. .gitignore)
+"""
+import os
+from dotenv import dotenv_values
+from _env_cache import COMPILED_PATH, find_env_path
+
+
+def compile_env(dotenv_path: str = None) -> str:
+    """Записывает значения из .env в env_compiled.py, возвращает путь к модулю"""
+    dotenv_path = os.path.abspath(dotenv_path) if dotenv_path else find_env_path()
+    if not dotenv_path:
+        raise FileNotFoundError(".env не найден")
+    values = {key: value for key, value in dotenv_values(dotenv_path).items() if value is not None}
+    with open(COMPILED_PATH, 'w', encoding='utf-8') as f:
+        f.write('# Сгенерировано tests/compile_env.py - не редактируйте вручную\n')
+        f.write(f'DOTENV_PATH = {dotenv_path!r}\n')
+        f.write(f'ENV = {values!r}\n')
+    return COMPILED_PATH
+
+
+if __name__ == '__main__':
+    path = compile_env()
+    print(f"✅ .env скомпилирован в {path}")
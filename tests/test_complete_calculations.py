@@ -1,15 +1,21 @@
 """
 Тестирование комплексного расчета всех даров (Ода, Туна, Триа, Чиа)
 """
+import pytest
+
 from src.calculations import GiftsCalculator
 
-def test_oda():
+@pytest.fixture(scope="module")
+def calculator():
+    """Один калькулятор на все тесты модуля"""
+    return GiftsCalculator()
+
+def test_oda(calculator):
     """Тест расчета Ода (дата рождения)"""
     print("=" * 50)
     print("ТЕСТ: ОДА (Основные данные)")
     print("=" * 50)
     
-    calculator = GiftsCalculator()
     birth_date = "15.05.1990"
     
     result = calculator.calculate_oda(birth_date)
@@ -25,13 +31,12 @@ def test_oda():
     print(f"  {result['calculation_details']['kun']}")
     print()
 
-def test_tuna():
+def test_tuna(calculator):
     """Тест расчета Туна (время рождения)"""
     print("=" * 50)
     print("ТЕСТ: ТУНА (Второстепенные данные)")
     print("=" * 50)
     
-    calculator = GiftsCalculator()
     birth_time = "14:30"
     kun_oda = 3  # Из примера Ода
     
@@ -49,13 +54,12 @@ def test_tuna():
     print(f"  {result['calculation_details']['kun']}")
     print()
 
-def test_tria():
+def test_tria(calculator):
     """Тест расчета Триа (координаты)"""
     print("=" * 50)
     print("ТЕСТ: ТРИА (Третьестепенные данные)")
     print("=" * 50)
     
-    calculator = GiftsCalculator()
     latitude = 49.9904411
     longitude = 36.2439857
     
@@ -74,13 +78,12 @@ def test_tria():
     print(f"  {result['calculation_details']['kun']}")
     print()
 
-def test_chia():
+def test_chia(calculator):
     """Тест расчета Чиа (имя и фамилия)"""
     print("=" * 50)
     print("ТЕСТ: ЧИА (Четверостепенные данные)")
     print("=" * 50)
     
-    calculator = GiftsCalculator()
     first_name = "Александр"
     last_name = "Иванов"
     
@@ -98,14 +101,12 @@ def test_chia():
     print(f"  {result['calculation_details']['kun']}")
     print()
 
-def test_complete_profile():
+def test_complete_profile(calculator):
     """Тест комплексного расчета всех даров"""
     print("=" * 50)
     print("ТЕСТ: КОМПЛЕКСНЫЙ РАСЧЕТ ВСЕХ ДАРОВ")
     print("=" * 50)
     
-    calculator = GiftsCalculator()
-    
     # Входные данные
     birth_date = "15.05.1990"
     birth_time = "14:30"
@@ -123,9 +124,7 @@ def test_complete_profile():
         last_name=last_name
     )
     
-    if result['status'] == 'error':
-        print(f"❌ Ошибка: {result['error']}")
-        return
+    assert result['status'] == 'success', result.get('error')
     
     print(f"\n👤 Имя: {result['name']['first']} {result['name']['last']}")
     print(f"📅 Дата: {result['birth_date']}")
@@ -168,40 +167,14 @@ def test_complete_profile():
     print("✅ Комплексный расчет успешно выполнен!")
     print()
 
-def test_kabbalah():
+@pytest.mark.parametrize("first, last", [
+    ("Александр", "Иванов"),
+    ("Мария", "Петрова"),
+    ("Иван", "Сидоров"),
+    ("Елена", "Смирнова")
+])
+def test_kabbalah(calculator, first, last):
     """Тест кабалистической таблицы"""
-    print("=" * 50)
-    print("ТЕСТ: КАБАЛИСТИЧЕСКАЯ ТАБЛИЦА")
-    print("=" * 50)
-    
-    calculator = GiftsCalculator()
-    
-    test_names = [
-        ("Александр", "Иванов"),
-        ("Мария", "Петрова"),
-        ("Иван", "Сидоров"),
-        ("Елена", "Смирнова")
-    ]
-    
-    for first, last in test_names:
-        result = calculator.calculate_chia(first, last)
-        print(f"{first} {last}: {result['gift_code']} (Ма={result['ma']}, Жи={result['ji']}, Кун={result['kun']})")
-    
-    print()
-
-if __name__ == "__main__":
-    print("\n🔮 ТЕСТИРОВАНИЕ КОМПЛЕКСНОГО РАСЧЕТА ДАРОВ\n")
-    
-    # Запускаем все тесты
-    test_oda()
-    test_tuna()
-    test_tria()
-    test_chia()
-    test_kabbalah()
-    test_complete_profile()
-    
-    print("=" * 50)
-    print("✅ ВСЕ ТЕСТЫ ЗАВЕРШЕНЫ")
-    print("=" * 50)
-
-
+    result = calculator.calculate_chia(first, last)
+    assert result['gift_code'] == f"{result['ma']}-{result['ji']}-{result['kun']}"
+    print(f"{first} {last}: {result['gift_code']} (Ма={result['ma']}, Жи={result['ji']}, Кун={result['kun']})")
@@ -3,18 +3,21 @@
 Запустите этот скрипт для проверки правильности настройки переменных окружения
 """
 import os
-from dotenv import load_dotenv
+import sys
+from _env_cache import get_env
 
-# Загружаем переменные из .env (если файл существует)
-load_dotenv()
+# Переменные окружения с учетом .env (если файл существует), разобранного один раз
+ENV = get_env()
 
-print("=" * 60)
+SEP = "=" * 60
+
+print(SEP)
 print("ПРОВЕРКА КОНФИГУРАЦИИ БОТА")
-print("=" * 60)
+print(SEP)
 print()
 
 # Проверка BOT_TOKEN
-bot_token = os.getenv('BOT_TOKEN')
+bot_token = ENV.get('BOT_TOKEN')
 if bot_token:
     print(f"✅ BOT_TOKEN: Установлен (длина: {len(bot_token)} символов)")
     if len(bot_token) < 40:
@@ -26,7 +29,7 @@ else:
 print()
 
 # Проверка DEEPSEEK_API_KEY
-deepseek_key = os.getenv('DEEPSEEK_API_KEY')
+deepseek_key = ENV.get('DEEPSEEK_API_KEY')
 if deepseek_key:
     print(f"✅ DEEPSEEK_API_KEY: Установлен (длина: {len(deepseek_key)} символов)")
     if len(deepseek_key) < 20:
@@ -39,7 +42,7 @@ else:
 print()
 
 # Проверка ADMIN_IDS
-admin_ids_str = os.getenv('ADMIN_IDS', '')
+admin_ids_str = ENV.get('ADMIN_IDS', '')
 if admin_ids_str:
     try:
         # Проверяем, есть ли пробелы (частая ошибка)
@@ -49,7 +52,7 @@ if admin_ids_str:
             print("   Удалите все пробелы: 123456789,987654321")
         
         # Пытаемся распарсить
-        admin_ids = [int(x.strip()) for x in admin_ids_str.split(',') if x.strip()]
+        admin_ids = list(map(int, filter(None, (x.strip() for x in admin_ids_str.split(',')))))
         if admin_ids:
             print(f"✅ ADMIN_IDS: Установлен ({len(admin_ids)} админов)")
             for admin_id in admin_ids:
@@ -68,29 +71,23 @@ else:
 print()
 
 # Проверка DEEPSEEK_API_URL
-api_url = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1')
+api_url = ENV.get('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1')
 print(f"✅ DEEPSEEK_API_URL: {api_url}")
 
 print()
 
 # Проверка DATABASE_PATH
-db_path = os.getenv('DATABASE_PATH', 'data/bot_database.db')
+db_path = ENV.get('DATABASE_PATH', 'data/bot_database.db')
 print(f"✅ DATABASE_PATH: {db_path}")
 
 # Проверяем существование директории для базы данных
-import pathlib
-db_dir = pathlib.Path(db_path).parent
-if db_dir.exists():
+db_dir = os.path.dirname(db_path) or '.'
+if os.access(db_dir, os.F_OK):
     print(f"   ✅ Директория существует: {db_dir}")
 else:
     print(f"   ⚠️  Директория НЕ существует: {db_dir}")
     print(f"   Она будет создана автоматически при запуске бота")
 
-print()
-print("=" * 60)
-print("ИТОГИ ПРОВЕРКИ")
-print("=" * 60)
-
 errors = []
 warnings = []
 
@@ -109,27 +106,20 @@ if not admin_ids_str:
 elif ' ' in admin_ids_str:
     errors.append("ADMIN_IDS содержит пробелы")
 
+# Итоги собираем целиком и выводим одной записью
+lines = ["", SEP, "ИТОГИ ПРОВЕРКИ", SEP]
+
 if errors:
-    print()
-    print("❌ КРИТИЧЕСКИЕ ОШИБКИ:")
-    for error in errors:
-        print(f"   • {error}")
-    print()
-    print("Исправьте ошибки перед запуском бота!")
+    lines += ["", "❌ КРИТИЧЕСКИЕ ОШИБКИ:"]
+    lines += [f"   • {error}" for error in errors]
+    lines += ["", "Исправьте ошибки перед запуском бота!"]
 
 if warnings:
-    print()
-    print("⚠️  ПРЕДУПРЕЖДЕНИЯ:")
-    for warning in warnings:
-        print(f"   • {warning}")
+    lines += ["", "⚠️  ПРЕДУПРЕЖДЕНИЯ:"]
+    lines += [f"   • {warning}" for warning in warnings]
 
 if not errors and not warnings:
-    print()
-    print("✅ Все переменные настроены правильно!")
-    print("Бот готов к запуску!")
-
-print()
-print("=" * 60)
-print("Для запуска бота выполните: python -m src.bot")
-print("=" * 60)
+    lines += ["", "✅ Все переменные настроены правильно!", "Бот готов к запуску!"]
 
+lines += ["", SEP, "Для запуска бота выполните: python -m src.bot", SEP]
+sys.stdout.write("\n".join(lines) + "\n")
@@ -0,0 +1,81 @@
+"""
+Постраничный список пользователей (get_all_users_with_subscriptions) на SQLite
+Запуск: pytest tests/test_database_pagination.py
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("dotenv")
+pytest.importorskip("supabase")
+
+# Config требует BOT_TOKEN при импорте
+os.environ.setdefault("BOT_TOKEN", "0" * 46)
+
+from src.config import Config
+from src.database import Database
+
+
+@pytest.fixture
+def local_tz(monkeypatch):
+    """Локальный часовой пояс не UTC, чтобы наивные даты отличались от UTC"""
+    monkeypatch.setenv("TZ", "Europe/Moscow")
+    time.tzset()
+    Database._parse_dt.cache_clear()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+    Database._parse_dt.cache_clear()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch, local_tz):
+    """База SQLite во временном каталоге"""
+    monkeypatch.setattr(Config, "USE_SUPABASE_API", False)
+    monkeypatch.setattr(Config, "USE_POSTGRESQL", False)
+    return Database(db_path=str(tmp_path / "bot.db"))
+
+
+async def _collect_pages(db, limit):
+    """Проходит все страницы, передавая курсор из последней строки"""
+    seen = []
+    before = None
+    while True:
+        rows = await db.get_all_users_with_subscriptions(limit=limit, before=before)
+        if not rows:
+            return seen
+        seen += [row["user_id"] for row in rows]
+        last = rows[-1]
+        before = (last["registration_date"], last["user_id"])
+
+
+def test_naive_legacy_row_on_page_boundary(db):
+    """Наивная (локальная) дата на границе страницы и та же дата в UTC у соседа"""
+    legacy_local = "2024-01-02 10:00:00"
+    same_moment_utc = datetime(2024, 1, 2, 10).astimezone(timezone.utc).isoformat()
+    users = [
+        (1, "2024-01-01T00:00:00+00:00"),
+        (2, same_moment_utc),
+        (3, legacy_local),
+        (4, "2024-01-03T00:00:00+00:00"),
+        (5, "2024-01-02T12:00:00+03:00"),
+    ]
+
+    async def scenario():
+        await db.init_db()
+        with sqlite3.connect(db.db_path) as conn:
+            conn.executemany(
+                "INSERT INTO users (user_id, registration_date) VALUES (?, ?)", users
+            )
+        try:
+            return await _collect_pages(db, limit=3)
+        finally:
+            await db.close()
+
+    # Пользователь 3 (наивная дата) - последний на первой странице, 2 - тот же момент на второй
+    assert asyncio.run(scenario()) == [4, 5, 3, 2, 1]
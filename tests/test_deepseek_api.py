@@ -3,14 +3,14 @@
 """
 import asyncio
 import aiohttp
-import os
-from dotenv import load_dotenv
+from _env_cache import get_env
 
-load_dotenv()
+ENV = get_env()
 
-async def test_deepseek():
-    api_key = os.getenv('DEEPSEEK_API_KEY')
-    api_url = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1')
+async def test_deepseek(session: aiohttp.ClientSession = None):
+    """Проверка DeepSeek API; session можно передать, чтобы переиспользовать соединение"""
+    api_key = ENV.get('DEEPSEEK_API_KEY')
+    api_url = ENV.get('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1')
     
     print("=" * 50)
     print("ТЕСТ DEEPSEEK API")
@@ -26,47 +26,10 @@ async def test_deepseek():
     try:
         print("🔄 Отправляю тестовый запрос к DeepSeek API...")
         
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Ты помощник."
-                    },
-                    {
-                        "role": "user",
-                        "content": "Скажи 'Привет, я работаю!'"
-                    }
-                ],
-                "temperature": 0.7,
-                "max_tokens": 100
-            }
-            
-            async with session.post(
-                f"{api_url}/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as response:
-                print(f"📊 Статус ответа: {response.status}")
-                
-                if response.status == 200:
-                    result = await response.json()
-                    answer = result['choices'][0]['message']['content']
-                    print(f"✅ API работает!")
-                    print(f"📝 Ответ от ИИ: {answer}")
-                    return True
-                else:
-                    error_text = await response.text()
-                    print(f"❌ Ошибка API: {response.status}")
-                    print(f"📄 Текст ошибки: {error_text}")
-                    return False
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                return await _send_test_request(own_session, api_url, api_key)
+        return await _send_test_request(session, api_url, api_key)
     
     except aiohttp.ClientError as e:
         print(f"❌ Ошибка соединения: {e}")
@@ -80,8 +43,56 @@ async def test_deepseek():
         traceback.print_exc()
         return False
 
+async def _send_test_request(session: aiohttp.ClientSession, api_url: str, api_key: str) -> bool:
+    """Тестовый запрос к /chat/completions через переданную сессию"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    data = {
+        "model": "deepseek-chat",
+        "messages": [
+            {
+                "role": "system",
+                "content": "Ты помощник."
+            },
+            {
+                "role": "user",
+                "content": "Скажи 'Привет, я работаю!'"
+            }
+        ],
+        "temperature": 0.7,
+        "max_tokens": 100
+    }
+    
+    async with session.post(
+        f"{api_url}/chat/completions",
+        headers=headers,
+        json=data,
+        timeout=aiohttp.ClientTimeout(total=30)
+    ) as response:
+        print(f"📊 Статус ответа: {response.status}")
+        
+        if response.status == 200:
+            result = await response.json()
+            answer = result['choices'][0]['message']['content']
+            print(f"✅ API работает!")
+            print(f"📝 Ответ от ИИ: {answer}")
+            return True
+        else:
+            error_text = await response.text()
+            print(f"❌ Ошибка API: {response.status}")
+            print(f"📄 Текст ошибки: {error_text}")
+            return False
+
+async def main():
+    """Запуск проверки с собственной сессией"""
+    async with aiohttp.ClientSession() as session:
+        return await test_deepseek(session)
+
 if __name__ == "__main__":
-    result = asyncio.run(test_deepseek())
+    result = asyncio.run(main())
     
     print()
     print("=" * 50)
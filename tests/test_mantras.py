@@ -0,0 +1,26 @@
+"""
+Тесты разбора сантры (parse_mantra)
+Запуск: pytest tests/test_mantras.py
+"""
+import pytest
+
+from src.mantras import parse_mantra
+
+@pytest.mark.parametrize("text, expected", [
+    ("Ши-а", [("команда", "Ши-а")]),
+    ("ши-а", [("команда", "Ши-а")]),
+    ("ДУ", [("команда", "Ду")]),
+    ("Ши ду мана", [("команда", "Ши"), ("команда", "Ду"), ("дар", "дар Ма-На")]),
+])
+def test_known_elements(text, expected):
+    """Команды - по имени без учёта регистра, дары - по нормализованному имени"""
+    result = parse_mantra(text)
+    assert [(e["type"], e["name"]) for e in result["elements"]] == expected
+    assert result["errors"] == []
+
+@pytest.mark.parametrize("text", ["Шиа", "шиа", "Шуа", "шуа"])
+def test_command_without_hyphen_is_not_recognized(text):
+    """Имя команды без дефиса командой не считается"""
+    result = parse_mantra(text)
+    assert [e["type"] for e in result["elements"]] == ["неизвестно"]
+    assert len(result["errors"]) == 1
@@ -1,16 +1,21 @@
 """
 Тестовый файл для проверки расчетов по системе Ма-Жи-Кун
 """
+from collections import Counter
+
 from src.calculations import GiftsCalculator
-from src.gifts_knowledge import get_gift_info, get_gifts_by_kun, format_gift_description
+from src.gifts_knowledge import get_all_gifts, get_gift_info, get_gifts_by_kun, format_gift_description
+
+# Калькулятор без состояния - один на все даты
+CALCULATOR = GiftsCalculator()
 
-def test_calculation(birth_date: str):
+SEP = "=" * 60
+
+def test_calculation(birth_date: str, calculator: GiftsCalculator = CALCULATOR):
     """Тестирование расчета для конкретной даты"""
-    calculator = GiftsCalculator()
-    
-    print("=" * 60)
+    print(SEP)
     print(f"Дата рождения: {birth_date}")
-    print("=" * 60)
+    print(SEP)
     
     result = calculator.calculate_gift(birth_date)
     
@@ -32,14 +37,14 @@ def test_calculation(birth_date: str):
     # Проверяем, есть ли дар в базе
     gift_info = get_gift_info(result['gift_code'])
     
-    print("\n" + "=" * 60)
+    print("\n" + SEP)
     if gift_info:
         print("✅ Дар найден в базе знаний!")
-        print("=" * 60)
+        print(SEP)
         print(format_gift_description(result['gift_code']))
     else:
         print("⚠️ Точного дара не найдено в базе")
-        print("=" * 60)
+        print(SEP)
         kun_gifts = get_gifts_by_kun(result['kun'])
         if kun_gifts:
             print(f"\n🔍 Найдено {len(kun_gifts)} даров с Кун = {result['kun']}:")
@@ -71,23 +76,19 @@ def main():
     for date in test_dates:
         test_calculation(date)
     
-    print("=" * 60)
+    print(SEP)
     print("✅ Тестирование завершено!")
-    print("=" * 60)
+    print(SEP)
     
     # Статистика базы знаний
-    from src.gifts_knowledge import get_all_gifts
     all_gifts = get_all_gifts()
     
     print(f"\n📚 В базе знаний {len(all_gifts)} даров:")
     
-    # Группируем по Кун
-    kun_stats = {}
-    for code in all_gifts.keys():
-        parts = code.split('-')
-        if len(parts) == 3:
-            kun = int(parts[2])
-            kun_stats[kun] = kun_stats.get(kun, 0) + 1
+    # Группируем по Кун (коды в формате "ма-жи-кун")
+    kun_stats = Counter(
+        int(code.rsplit('-', 1)[1]) for code in all_gifts if code.count('-') == 2
+    )
     
     print("\n📊 Распределение по Кун:")
     for kun in sorted(kun_stats.keys()):
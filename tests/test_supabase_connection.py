@@ -2,51 +2,62 @@
 Тест подключения к Supabase через API ключ
 """
 import asyncio
-import os
+import base64
+import binascii
+import functools
+import json
 import sys
-from dotenv import load_dotenv
+from _env_cache import get_env
+from _db_url import db_url_kind, normalize_db_url
 
 # Исправляем кодировку для Windows
 if sys.platform == 'win32':
-    import io
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
 
 # Загружаем переменные из .env
-load_dotenv()
+ENV = get_env()
+
+SEP = "=" * 60
+
+@functools.lru_cache(maxsize=1)
+def decode_supabase_key(key: str) -> dict:
+    """Роль и срок действия из JWT-ключа Supabase (пустой dict, если ключ не JWT)"""
+    if not key.startswith('eyJ'):
+        return {}
+    parts = key.split('.', 2)
+    if len(parts) < 2:
+        return {}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(parts[1] + '=='))
+    except (binascii.Error, json.JSONDecodeError, ValueError, TypeError):
+        # Не base64 / не JSON / не UTF-8 (UnicodeDecodeError - тоже ValueError)
+        return {}
+    if not isinstance(payload, dict):
+        return {}
+    return {'role': payload.get('role', 'unknown'), 'exp': payload.get('exp')}
 
 async def test_supabase_api():
     """Тест подключения через Supabase REST API"""
     from supabase import create_client, Client
     
-    supabase_url = os.getenv('SUPABASE_URL', 'https://ouodquakgyyeiyihmoxg.supabase.co')
-    supabase_key = os.getenv('SUPABASE_API_KEY', '') or os.getenv('SUPABASE_ANON_KEY', '')
+    supabase_url = ENV.get('SUPABASE_URL', 'https://ouodquakgyyeiyihmoxg.supabase.co')
+    supabase_key = ENV.get('SUPABASE_API_KEY', '') or ENV.get('SUPABASE_ANON_KEY', '')
     
-    print("=" * 60)
+    print(SEP)
     print("ТЕСТ ПОДКЛЮЧЕНИЯ К SUPABASE")
-    print("=" * 60)
+    print(SEP)
     print()
     print(f"📡 URL: {supabase_url}")
     if supabase_key:
-        # Определяем тип ключа по началу
-        if supabase_key.startswith('eyJ'):
-            try:
-                import base64
-                import json
-                # Декодируем JWT токен
-                parts = supabase_key.split('.')
-                if len(parts) >= 2:
-                    payload = json.loads(base64.urlsafe_b64decode(parts[1] + '=='))
-                    role = payload.get('role', 'unknown')
-                    print(f"🔑 API Key: {supabase_key[:20]}... (role: {role})")
-                    if role == 'anon':
-                        print("   ⚠️  Используется 'anon' ключ - может быть ограничен RLS политиками")
-                        print("   💡 Рекомендуется использовать 'service_role' ключ для полного доступа")
-                    elif role == 'service_role':
-                        print("   ✅ Используется 'service_role' ключ - полный доступ")
-                else:
-                    print(f"🔑 API Key: {supabase_key[:20]}...")
-            except:
-                print(f"🔑 API Key: {supabase_key[:20]}...")
+        # Определяем тип ключа по роли из JWT
+        role = decode_supabase_key(supabase_key).get('role')
+        if role:
+            print(f"🔑 API Key: {supabase_key[:20]}... (role: {role})")
+            if role == 'anon':
+                print("   ⚠️  Используется 'anon' ключ - может быть ограничен RLS политиками")
+                print("   💡 Рекомендуется использовать 'service_role' ключ для полного доступа")
+            elif role == 'service_role':
+                print("   ✅ Используется 'service_role' ключ - полный доступ")
         else:
             print(f"🔑 API Key: {supabase_key[:20]}...")
     else:
@@ -82,7 +93,10 @@ async def test_supabase_api():
             if 'PGRST205' in error_msg or 'schema cache' in error_msg.lower():
                 print("\n💡 Возможные причины:")
                 print("   1. PostgREST кэш схемы не обновился (подождите 1-2 минуты)")
-                print("   2. Используется 'anon' ключ вместо 'service_role'")
+                if decode_supabase_key(supabase_key).get('role') == 'anon':
+                    print("   2. Используется 'anon' ключ вместо 'service_role' (ваш ключ - anon)")
+                else:
+                    print("   2. Используется 'anon' ключ вместо 'service_role'")
                 print("   3. RLS политики блокируют доступ")
                 print("\n   Решение:")
                 print("   - Используйте 'service_role' ключ для полного доступа")
@@ -116,19 +130,39 @@ async def test_supabase_api():
         ]
         
         found_tables = []
-        for table_name in tables_to_check:
-            try:
-                response = supabase.table(table_name).select('*').limit(1).execute()
-                found_tables.append(table_name)
-                print(f"   ✅ {table_name}")
-            except Exception as e:
-                print(f"   ⚠️  {table_name}: {e}")
+        try:
+            # Все таблицы одним запросом (migrations/008_list_public_tables_function.sql)
+            response = supabase.rpc('list_public_tables').execute()
+            existing_tables = {row['table_name'] for row in response.data or []}
+            for table_name in tables_to_check:
+                if table_name in existing_tables:
+                    found_tables.append(table_name)
+                    print(f"   ✅ {table_name}")
+                else:
+                    print(f"   ⚠️  {table_name}: таблица не найдена")
+        except Exception as e:
+            # Функция ещё не создана - проверяем каждую таблицу отдельным запросом
+            print(f"   ℹ️  list_public_tables недоступна ({e}), проверяю таблицы по отдельности")
+            # Клиент синхронный: запросы к таблицам идут параллельно в потоках
+            results = await asyncio.gather(
+                *(
+                    asyncio.to_thread(supabase.table(table_name).select('*').limit(1).execute)
+                    for table_name in tables_to_check
+                ),
+                return_exceptions=True
+            )
+            for table_name, result in zip(tables_to_check, results):
+                if isinstance(result, Exception):
+                    print(f"   ⚠️  {table_name}: {result}")
+                else:
+                    found_tables.append(table_name)
+                    print(f"   ✅ {table_name}")
         
         print(f"\n✅ Найдено таблиц: {len(found_tables)}/{len(tables_to_check)}")
         
-        print("\n" + "=" * 60)
+        print("\n" + SEP)
         print("✅ ПОДКЛЮЧЕНИЕ К SUPABASE РАБОТАЕТ!")
-        print("=" * 60)
+        print(SEP)
         print("\n💡 Теперь можно запускать бота - он будет использовать Supabase")
         return True
         
@@ -146,13 +180,12 @@ async def test_supabase_api():
 async def test_supabase_postgres():
     """Тест подключения через прямое подключение PostgreSQL"""
     import asyncpg
-    from urllib.parse import quote_plus, urlparse, parse_qs, urlencode, urlunparse
     
-    database_url = os.getenv('SUPABASE_DB_URL', '') or os.getenv('DATABASE_URL', '')
+    database_url = ENV.get('SUPABASE_DB_URL', '') or ENV.get('DATABASE_URL', '')
     
-    print("\n" + "=" * 60)
+    print("\n" + SEP)
     print("ТЕСТ ПОДКЛЮЧЕНИЯ К SUPABASE (PostgreSQL)")
-    print("=" * 60)
+    print(SEP)
     print()
     
     if not database_url:
@@ -160,54 +193,28 @@ async def test_supabase_postgres():
         print("   Используется подключение через REST API")
         return False
     
-    # Показываем URL с замаскированным паролем
+    # Маскированный URL и URL с закодированным паролем - из одного разбора
     try:
-        parsed = urlparse(database_url)
-        if '@' in parsed.netloc:
-            auth_part = parsed.netloc.split('@')[0]
-            host_part = parsed.netloc.split('@')[1]
-            if ':' in auth_part:
-                username, password = auth_part.split(':', 1)
-                masked_url = f"{parsed.scheme}://{username}:***@{host_part}{parsed.path}"
-            else:
-                masked_url = f"{parsed.scheme}://***@{host_part}{parsed.path}"
-        else:
-            masked_url = database_url[:80]
-        print(f"📡 Database URL: {masked_url}")
-        
-        # Проверяем формат
-        if 'db.' in database_url and '.supabase.co' in database_url:
-            print("   ✅ Формат Direct connection обнаружен")
-        elif 'pooler.supabase.com' in database_url:
-            print("   ✅ Формат Connection pooling обнаружен")
-        else:
-            print("   ⚠️  Нестандартный формат URL")
-    except:
-        print(f"📡 Database URL: {database_url[:80]}...")
+        masked_url, encoded_url, _ = normalize_db_url(database_url)
+    except ValueError as e:
+        print(f"❌ Ошибка при разборе SUPABASE_DB_URL: {e}")
+        return False
+    print(f"📡 Database URL: {masked_url}")
+    
+    # Проверяем формат
+    kind = db_url_kind(database_url)
+    if kind == 'direct':
+        print("   ✅ Формат Direct connection обнаружен")
+    elif kind == 'pool':
+        print("   ✅ Формат Connection pooling обнаружен")
+    else:
+        print("   ⚠️  Нестандартный формат URL")
     print()
     
     try:
-        # Парсим URL и правильно кодируем пароль
-        parsed = urlparse(database_url)
-        
-        # Если пароль содержит специальные символы, кодируем их
-        if '@' in parsed.netloc:
-            auth_part = parsed.netloc.split('@')[0]
-            if ':' in auth_part:
-                username, password = auth_part.split(':', 1)
-                # Кодируем пароль
-                encoded_password = quote_plus(password)
-                # Пересобираем URL
-                new_netloc = f"{username}:{encoded_password}@{parsed.netloc.split('@')[1]}"
-                database_url = urlunparse((
-                    parsed.scheme,
-                    new_netloc,
-                    parsed.path,
-                    parsed.params,
-                    parsed.query,
-                    parsed.fragment
-                ))
-                print(f"🔧 Исправлен URL (пароль закодирован)")
+        if encoded_url != database_url:
+            database_url = encoded_url
+            print(f"🔧 Исправлен URL (пароль закодирован)")
         
         print("🔄 Подключаюсь к PostgreSQL...")
         conn = await asyncpg.connect(database_url)
@@ -259,9 +266,9 @@ async def test_supabase_postgres():
 async def main():
     """Главная функция"""
     # Проверяем конфигурацию (без импорта Config, чтобы не требовать BOT_TOKEN)
-    supabase_url = os.getenv('SUPABASE_URL', 'https://ouodquakgyyeiyihmoxg.supabase.co')
-    supabase_key = os.getenv('SUPABASE_API_KEY', '') or os.getenv('SUPABASE_ANON_KEY', '')
-    database_url = os.getenv('SUPABASE_DB_URL', '') or os.getenv('DATABASE_URL', '')
+    supabase_url = ENV.get('SUPABASE_URL', 'https://ouodquakgyyeiyihmoxg.supabase.co')
+    supabase_key = ENV.get('SUPABASE_API_KEY', '') or ENV.get('SUPABASE_ANON_KEY', '')
+    database_url = ENV.get('SUPABASE_DB_URL', '') or ENV.get('DATABASE_URL', '')
     
     use_supabase_api = bool(supabase_key and supabase_url)
     use_postgresql = bool(database_url)
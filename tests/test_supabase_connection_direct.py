@@ -3,51 +3,50 @@
 """
 import asyncio
 import asyncpg
-import os
+import functools
+import socket
 import sys
-from dotenv import load_dotenv
-from urllib.parse import quote_plus, urlparse, urlunparse
+from _env_cache import get_env
+from _db_url import normalize_db_url
 
 # Исправляем кодировку для Windows
 if sys.platform == 'win32':
-    import io
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
 
-load_dotenv()
+ENV = get_env()
+
+SEP = "=" * 60
+
+@functools.lru_cache(maxsize=32)
+def resolve(host: str) -> str:
+    """IP-адрес хоста (IPv4 или IPv6), повторные проверки того же хоста не ходят в DNS"""
+    return socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)[0][4][0]
 
 async def test_connection():
     """Тестирует подключение к Supabase"""
-    print("=" * 60)
+    print(SEP)
     print("🔍 ТЕСТ ПОДКЛЮЧЕНИЯ К SUPABASE")
-    print("=" * 60)
+    print(SEP)
     print()
     
-    database_url = os.getenv('SUPABASE_DB_URL') or os.getenv('DATABASE_URL', '')
+    database_url = ENV.get('SUPABASE_DB_URL') or ENV.get('DATABASE_URL', '')
     
     if not database_url:
         print("❌ SUPABASE_DB_URL не установлен!")
         return
     
-    # Маскируем пароль для вывода
-    if '@' in database_url:
-        parts = database_url.split('@')
-        if ':' in parts[0]:
-            user_pass = parts[0].split(':')
-            if len(user_pass) == 2:
-                masked_url = f"{user_pass[0]}:***@{parts[1]}"
-            else:
-                masked_url = database_url
-        else:
-            masked_url = database_url
-    else:
-        masked_url = database_url
+    # Маскированный URL и URL с закодированным паролем - из одного разбора
+    try:
+        masked_url, encoded_url, parsed = normalize_db_url(database_url)
+    except ValueError as e:
+        print(f"❌ Ошибка при парсинге URL: {e}")
+        return
     
     print(f"📋 URL (пароль скрыт): {masked_url}")
     print()
     
-    # Парсим URL
+    # Анализируем URL
     try:
-        parsed = urlparse(database_url)
         print(f"🔍 Анализ URL:")
         print(f"   Схема: {parsed.scheme}")
         print(f"   Хост: {parsed.hostname}")
@@ -58,9 +57,8 @@ async def test_connection():
         # Проверяем хост
         if parsed.hostname:
             print(f"🌐 Проверка хоста: {parsed.hostname}")
-            import socket
             try:
-                ip = socket.gethostbyname(parsed.hostname)
+                ip = await asyncio.to_thread(resolve, parsed.hostname)
                 print(f"   ✅ Хост разрешен: {ip}")
             except socket.gaierror as e:
                 print(f"   ❌ Ошибка DNS: {e}")
@@ -74,62 +72,42 @@ async def test_connection():
         print(f"❌ Ошибка при парсинге URL: {e}")
         return
     
-    # Обрабатываем URL для подключения
-    conn_url = database_url.replace('?pgbouncer=true', '').split('?')[0]
-    
-    # Кодируем пароль
-    try:
-        parsed = urlparse(conn_url)
-        if '@' in parsed.netloc and ':' in parsed.netloc.split('@')[0]:
-            auth_part = parsed.netloc.split('@')[0]
-            username, password = auth_part.split(':', 1)
-            
-            # Кодируем пароль
-            if '%' not in password:
-                encoded_password = quote_plus(password, safe='')
-            else:
-                encoded_password = password
-            
-            new_netloc = f"{username}:{encoded_password}@{parsed.netloc.split('@')[1]}"
-            conn_url = urlunparse((
-                parsed.scheme,
-                new_netloc,
-                parsed.path,
-                parsed.params,
-                parsed.query,
-                parsed.fragment
-            ))
-    except Exception as e:
-        print(f"⚠️ Предупреждение при обработке URL: {e}")
+    # URL для подключения: пароль уже закодирован, параметры (?pgbouncer=true) asyncpg не нужны
+    conn_url = encoded_url.split('?')[0]
     
     # Пробуем подключиться
     print()
     print("🔗 Попытка подключения...")
     try:
-        conn = await asyncpg.connect(conn_url, timeout=10)
+        # Пул на одно соединение: подключение открывается при создании пула
+        pool = await asyncpg.create_pool(conn_url, min_size=1, max_size=1, timeout=10)
         print("✅ Подключение успешно!")
         
-        # Проверяем версию PostgreSQL
-        version = await conn.fetchval("SELECT version()")
-        print(f"📊 Версия PostgreSQL: {version.split(',')[0]}")
+        try:
+            async with pool.acquire() as conn:
+                # Версия PostgreSQL и таблицы бота - одним запросом
+                rows = await conn.fetch("""
+                    SELECT 'version' AS key, version() AS value
+                    UNION ALL
+                    SELECT 'tables', string_agg(table_name::text, ',' ORDER BY table_name)
+                    FROM information_schema.tables 
+                    WHERE table_schema = 'public' 
+                    AND table_name LIKE 'telegram_%'
+                """)
+        finally:
+            await pool.close()
         
-        # Проверяем существующие таблицы
-        tables = await conn.fetch("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name LIKE 'telegram_%'
-            ORDER BY table_name
-        """)
+        info = {row['key']: row['value'] for row in rows}
+        print(f"📊 Версия PostgreSQL: {info['version'].split(',')[0]}")
         
+        tables = info['tables'].split(',') if info['tables'] else []
         if tables:
             print(f"\n📋 Найдено таблиц: {len(tables)}")
             for table in tables:
-                print(f"   - {table['table_name']}")
+                print(f"   - {table}")
         else:
             print("\n📋 Таблицы не найдены (миграция еще не применена)")
         
-        await conn.close()
         print("\n✅ Тест завершен успешно!")
         
     except Exception as e: